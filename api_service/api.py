@@ -8,8 +8,9 @@ from flask import (
     request,
     current_app,
 )
-from helpers import api_response
+from helpers import api_response, sse_response
 from maps import Maps
+from geo import parse_location
 from schema.users import user_schema
 from jsonschema import validate, ValidationError
 from datetime import datetime, timezone
@@ -47,6 +48,16 @@ def get_llm_tools():
     return current_app.config["LLM_TOOLS"]
 
 
+def get_job_queue():
+    return current_app.config["JOB_QUEUE"]
+
+
+def invalidate_user_profile(email):
+    """Marks the user's cached LLM profile snapshot stale after a profile write."""
+    get_data_retriever().bump_profile_version(email)
+    get_llm_tools().profile_store.invalidate(email)
+
+
 @api_blueprint.route("/", methods=["POST"])
 def healthcheck():
     return api_response(
@@ -72,6 +83,20 @@ def test_gemini():
     )
 
 
+@api_blueprint.route("/metrics", methods=["POST"])
+def get_metrics():
+    return api_response(
+        success=True,
+        message="successful",
+        data={
+            "maps": maps.get_metrics(),
+            "llm": get_llm_tools().get_metrics(),
+            "jobs": get_job_queue().stats(),
+        },
+        status=200,
+    )
+
+
 # Fetch document by Collection and Document ID
 # Example: http://localhost:5000/api/fetch-document-by-id?document_id=1&collection_name=users
 @api_blueprint.route("/fetch-document-by-id", methods=["POST"])
@@ -178,6 +203,7 @@ def update_user():
             "users", email, updated_data
         )
         if result:
+            invalidate_user_profile(email)
             return api_response(
                 success=True, message="User updated", data=updated_data, status=200
             )
@@ -201,6 +227,9 @@ def generate_user_description():
         if not existing_user:
             return api_response(success=False, message="User not found", status=404)
 
+        if data.get("stream"):
+            return sse_response(stream_user_description(email, existing_user))
+
         gemini_description = get_llm_tools().generate_user_description(email=email)
 
         updated_data = {**existing_user, "geminiDescription": gemini_description}
@@ -209,6 +238,7 @@ def generate_user_description():
             "users", email, updated_data
         )
         if result:
+            invalidate_user_profile(email)
             return api_response(
                 success=True,
                 message="Description generated and saved!",
@@ -223,6 +253,28 @@ def generate_user_description():
         return api_response(success=False, message=str(e), status=500)
 
 
+def stream_user_description(email, existing_user):
+    """
+    SSE events for /generateUserDescription: "token" per generated chunk, then "done"
+    once the description is saved (or "error").
+    """
+    try:
+        chunks = []
+        for text in get_llm_tools().stream_user_description(email=email):
+            chunks.append(text)
+            yield "token", {"text": text}
+        gemini_description = "".join(chunks).strip()
+
+        updated_data = {**existing_user, "geminiDescription": gemini_description}
+        if not get_data_retriever().write_to_collection_with_id("users", email, updated_data):
+            yield "error", {"message": "Failed to generate description"}
+            return
+        invalidate_user_profile(email)
+        yield "done", {"geminiDescription": gemini_description}
+    except Exception as e:
+        yield "error", {"message": str(e)}
+
+
 # Saved Places from Google Takeout
 @api_blueprint.route("/saved-places", methods=["POST"])
 def get_saved_places():
@@ -261,6 +313,8 @@ def process_takout_files():
             success, message = csv_uploader.process_folder(folder_path, user_email)
             os.remove(folder_path)
 
+        # Saved places may have been written even if processing failed part way
+        invalidate_user_profile(user_email)
         if not success:
             return api_response(
                 success=False, message=f"Failed to process files: {message}", status=500
@@ -274,6 +328,8 @@ def get_nearby_attractions():
     data = request.get_json()
     user_location = data.get("location")  # e.g., "37.7749,-122.4194"
     radius = data.get("radius", 5000)  # default radius in meters
+    if not _is_valid_location(user_location):
+        return api_response(success=False, message="A valid location (lat,lng) is required", status=400)
 
     response = maps.get_nearby_attractions(user_location, radius)
 
@@ -297,6 +353,8 @@ def get_nearby_attractions():
 def get_nearby_restaurants():
     user_location = request.args.get("location")  # e.g., "37.7749,-122.4194"
     radius = request.args.get("radius", 5000)  # default radius in meters
+    if not _is_valid_location(user_location):
+        return api_response(success=False, message="A valid location (lat,lng) is required", status=400)
 
     response = maps.get_nearby_restaurants(user_location, radius)
 
@@ -315,6 +373,66 @@ def get_nearby_restaurants():
         )
 
 
+# API to get nearby attractions as constructed places, served from the place index when possible
+@api_blueprint.route("/v2/nearby-attractions", methods=["POST"])
+def search_nearby_attractions():
+    data = request.get_json()
+    user_location = data.get("location")  # e.g., "37.7749,-122.4194"
+    radius = data.get("radius", 5000)  # default radius in meters
+    if not _is_valid_location(user_location):
+        return api_response(success=False, message="A valid location (lat,lng) is required", status=400)
+
+    places = maps.search_nearby_attractions(user_location, radius, profile="list")
+
+    if places is not None:
+        return api_response(
+            success=True,
+            message="Nearby attractions fetched successfully",
+            data=places,
+            status=200,
+        )
+    else:
+        return api_response(
+            success=False,
+            message="Failed to fetch nearby attractions",
+            status=502,
+        )
+
+
+# API to get nearby restaurants as constructed places, served from the place index when possible
+@api_blueprint.route("/v2/nearby-restaurants", methods=["POST"])
+def search_nearby_restaurants():
+    data = request.get_json()
+    user_location = data.get("location")  # e.g., "37.7749,-122.4194"
+    radius = data.get("radius", 5000)  # default radius in meters
+    if not _is_valid_location(user_location):
+        return api_response(success=False, message="A valid location (lat,lng) is required", status=400)
+
+    places = maps.search_nearby_restaurants(user_location, radius, profile="list")
+
+    if places is not None:
+        return api_response(
+            success=True,
+            message="Nearby restaurants fetched successfully",
+            data=places,
+            status=200,
+        )
+    else:
+        return api_response(
+            success=False,
+            message="Failed to fetch nearby restaurants",
+            status=502,
+        )
+
+
+def _is_valid_location(location):
+    try:
+        parse_location(location)
+    except (AttributeError, ValueError):
+        return False
+    return True
+
+
 # API to get place details
 @api_blueprint.route("/place-details", methods=["POST"])
 def get_place_details():
@@ -325,10 +443,32 @@ def get_place_details():
     latitude = data.get("latitude", "37.7749")
     longitude = data.get("longitude", "-122.4194")
     user_location = f"{latitude},{longitude}"
+    if data.get("stream"):
+        return sse_response(stream_place_details(email, place_id, user_location))
     try:
         place_data = get_data_retriever().fetch_document_by_id(
             collection_name="place_details", document_id=document_id
         )
+        if not place_data and data.get("async"):
+            # Return the Maps data now and add the interesting facts in the background
+            place_data = maps.get_place_details(place_id=place_id, origin=user_location)
+            if place_data is None:
+                return api_response(success=False, message="Failed to fetch place details", status=502)
+            job_id = get_job_queue().submit(
+                enrich_place_details,
+                get_llm_tools(),
+                get_data_retriever(),
+                email,
+                dict(place_data),
+                document_id,
+                key=document_id,
+            )
+            return api_response(
+                success=True,
+                message="Place details fetched, interesting facts are being generated",
+                data={"place": place_data, "job": get_job_queue().get(job_id)},
+                status=202,
+            )
         if not place_data:
             place_data = maps.get_place_details(place_id=place_id, origin=user_location)
             place_data = get_llm_tools().process_place_details(
@@ -349,6 +489,69 @@ def get_place_details():
         return api_response(success=False, message=str(e), status=500)
 
 
+def enrich_place_details(llm_tools, data_retriever, email, place_data, document_id, progress):
+    """
+    Background job for asynchronous /place-details: adds the interesting facts and saves the place details.
+    Runs outside the request, so it gets its services passed in.
+    """
+    with llm_tools.background_priority():
+        place_data = llm_tools.process_place_details(email=email, place_data=place_data, progress=progress)
+    data_retriever.write_to_collection_with_id(
+        collection_name="place_details",
+        document_id=document_id,
+        data={"email": email, **place_data},
+    )
+    return place_data
+
+
+@api_blueprint.route("/place-details-job", methods=["POST"])
+def get_place_details_job():
+    data = request.get_json()
+    job_id = data.get("jobId")
+    if not job_id:
+        return api_response(success=False, message="Job ID is required", status=400)
+
+    job = get_job_queue().get(job_id)
+    if not job:
+        return api_response(success=False, message="Job not found", status=404)
+    return api_response(success=True, message=f"Job {job['status']}", data=job, status=200)
+
+
+def stream_place_details(email, place_id, user_location):
+    """
+    SSE events for /place-details: "place" with the Maps data as soon as it is fetched,
+    "token" per interesting-facts chunk, then "done" with the saved place details (or "error").
+    """
+    document_id = f"{place_id}--{email}"
+    try:
+        place_data = get_data_retriever().fetch_document_by_id(
+            collection_name="place_details", document_id=document_id
+        )
+        if place_data:
+            yield "done", place_data
+            return
+
+        place_data = maps.get_place_details(place_id=place_id, origin=user_location)
+        if place_data is None:
+            yield "error", {"message": "Failed to fetch place details"}
+            return
+        yield "place", place_data
+        chunks = []
+        for text in get_llm_tools().stream_interesting_facts(email=email, place_data=place_data):
+            chunks.append(text)
+            yield "token", {"text": text}
+        place_data["interesting_facts"] = "".join(chunks).strip()
+
+        get_data_retriever().write_to_collection_with_id(
+            collection_name="place_details",
+            document_id=document_id,
+            data={"email": email, **place_data},
+        )
+        yield "done", place_data
+    except Exception as e:
+        yield "error", {"message": str(e)}
+
+
 @api_blueprint.route("/get-points-of-interest", methods=["POST"])
 def get_points_of_interest():
     data = request.get_json()
@@ -357,6 +560,10 @@ def get_points_of_interest():
     longitude = data.get("longitude", "-122.4194")
     radius = data.get("radius", 25)
     weather = data.get("weather", "sunny")
+    # "distance" (nearest first), "local" (personalized, no LLM) or "llm" (local pre-rank, then Gemini filter)
+    ranking = data.get("ranking", "distance")
+    if ranking not in ("distance", "local", "llm"):
+        return api_response(success=False, message=f"Unknown ranking: {ranking}", status=400)
 
     try:
         user_data = get_data_retriever().fetch_document_by_id("users", user_email)
@@ -369,15 +576,21 @@ def get_points_of_interest():
         logger.info(f"Place types data: {json.dumps(text_queries)}")
         # Get places list
         places_result = maps.get_nearby_places(
-            location=user_location, radius=radius * MILES_TO_METERS, queries=text_queries
+            location=user_location,
+            radius=radius * MILES_TO_METERS,
+            queries=text_queries,
+            # The LLM filter reads reviews and summaries, the other modes only need the cards
+            profile="rank" if ranking == "llm" else "list",
         )
-        places_result = sorted(places_result, key=lambda x: float(x["distance"]))
+        places_result = maps.sort_by_distance(places_result)
         logger.info(f"Places_result: {json.dumps([place["distance"] for place in places_result])}")
-        # Call LLM to filter
-        # filtered_places = get_llm_tools().filter_relevant_places(
-        #     email=user_email, places=places_result, weather=weather
-        # )
-        # logger.info(f"Relevant places: {json.dumps([place["title"] for place in places_result])}")
+        if ranking == "local":
+            places_result = get_llm_tools().rank_places_locally(email=user_email, places=places_result)
+        elif ranking == "llm":
+            places_result = get_llm_tools().filter_relevant_places(
+                email=user_email, places=places_result, weather=weather
+            )
+            logger.info(f"Relevant places: {json.dumps([place["title"] for place in places_result])}")
         return api_response(
             success=True,
             message="Points of interest retrieved",
@@ -412,18 +625,20 @@ def search_points_of_interest():
                 query=query_info["text_query"],
                 location=user_location,
                 radius=radius * MILES_TO_METERS,
+                profile="rank",
             )
             logger.info(f"Search result: {json.dumps(places_result)}")
         else:
-            place_types = query_info.get(
-                "types", get_llm_tools().generate_place_types(email=user_email)
+            place_types = query_info.get("types") or get_llm_tools().generate_place_types(
+                email=user_email
             )
             logger.info(f"Place types result: {json.dumps(place_types)}")
-            places_result = maps.get_nearby_places(
+            places_result = maps.search_nearby_places_by_types(
                 location=user_location,
                 radius=radius * MILES_TO_METERS,
                 types=place_types,
-            )
+                profile="rank",
+            ) or []
             logger.info(f"Nearby result: {json.dumps(places_result)}")
 
         # Call LLM to filter
@@ -483,6 +698,7 @@ def save_places_to_visit():
             "users", user_email, user_data
         )
         if result:
+            invalidate_user_profile(user_email)
             return api_response(
                 success=True, message="Place bookmarked successfully", status=200
             )
@@ -529,6 +745,7 @@ def remove_bookmarked_place():
             "users", user_email, user_data
         )
         if result:
+            invalidate_user_profile(user_email)
             return api_response(
                 success=True,
                 message="Place removed from bookmarks successfully",
@@ -10,6 +10,7 @@ from data_retriever import DataRetriever
 from google.cloud import firestore
 from csv_uploader import CSVUploader
 from llm_tools import LLMTools
+from jobs import JobQueue
 from dotenv import load_dotenv
 
 app = Flask(__name__)
@@ -42,6 +43,9 @@ app.config["CSV_UPLOADER"] = csv_uploader
 llm = LLMTools(data_retriever)
 app.config["LLM_TOOLS"] = llm
 
+job_queue = JobQueue()
+app.config["JOB_QUEUE"] = job_queue
+
 
 # Custom error handler for 400 Bad Request error
 @app.errorhandler(400)
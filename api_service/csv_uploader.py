@@ -1,6 +1,7 @@
 import os
 import csv
 import io
+import hashlib
 from datetime import datetime
 from data_retriever import DataRetriever
 from zipfile import ZipFile
@@ -13,6 +14,8 @@ maps = Maps()
 
 class CSVUploader:
 
+    PLACE_ID_CACHE_COLLECTION = "place_id_cache"
+
     def __init__(self, data_retriever: DataRetriever):
         self.data_retriever = data_retriever
 
@@ -35,6 +38,39 @@ class CSVUploader:
                 return True
         return False
 
+    def resolve_place_id(self, url: str) -> str:
+        """
+        Resolves a saved-place URL to a place ID. IDs encoded in the URL are free;
+        otherwise IDs resolved by earlier imports (from any user) are reused from
+        Firestore before falling back to Maps.
+
+        Args:
+            url (str): Google Maps URL from the Takeout CSV
+
+        Returns:
+            str: place ID, None if not found, "" if resolution failed
+        """
+        place_id = maps.get_place_id_offline(url)
+        if place_id or not url:
+            return place_id
+
+        document_id = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        cached = self.data_retriever.fetch_document_by_id(
+            self.PLACE_ID_CACHE_COLLECTION, document_id
+        )
+        if cached and cached.get("place_id"):
+            maps.place_id_cache.set(url, cached["place_id"])
+            return cached["place_id"]
+
+        place_id = maps.get_place_id(url)
+        if place_id:
+            self.data_retriever.write_to_collection_with_id(
+                self.PLACE_ID_CACHE_COLLECTION,
+                document_id,
+                {"url": url, "place_id": place_id},
+            )
+        return place_id
+
     def process_csv_file(self, csv_file, user_email):
         reader = csv.DictReader(io.TextIOWrapper(csv_file, "utf-8"))
         results = []
@@ -42,7 +78,7 @@ class CSVUploader:
             title = row.get("Title")
             if self.check_duplicate(user_email, title):
                 continue  # Skip duplicates
-            place_id = maps.get_place_id(row.get("URL"))
+            place_id = self.resolve_place_id(row.get("URL"))
             types = ""
             place_description = ""
             geo_location = ""
@@ -148,3 +148,16 @@ class DataRetriever:
         except Exception as e:
             print(f"Error updating document: {e}")
             return False
+
+    def bump_profile_version(self, user_id: str) -> bool:
+        """
+        Increments the user's profileVersion so cached profile snapshots are rebuilt.
+        Call after any write that changes saved places, bookmarks, interests or descriptions.
+
+        Args:
+            user_id (str): user ID
+
+        Returns:
+            bool: True if the update was successful, else False
+        """
+        return self.update_users_field(user_id, {"profileVersion": firestore.Increment(1)})
@@ -0,0 +1,102 @@
+import math
+import numpy as np
+
+EARTH_RADIUS_MILES = 3959
+
+_GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def parse_location(location: str):
+    """
+    Parses a "lat,lng" location string.
+
+    Returns:
+        tuple: (latitude, longitude) as floats
+    """
+    latitude, longitude = location.split(",")
+    return float(latitude.strip()), float(longitude.strip())
+
+
+def encode_geohash(latitude: float, longitude: float, precision: int = 6) -> str:
+    """
+    Encodes a coordinate as a geohash cell.
+
+    Args:
+        latitude (float)
+        longitude (float)
+        precision (int): number of characters, 6 is roughly a 1.2km x 0.6km cell
+
+    Returns:
+        str: the geohash of the cell containing the coordinate
+    """
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    geohash = []
+    bit, ch, even = 0, 0, True
+    while len(geohash) < precision:
+        value_range, value = (lng_range, longitude) if even else (lat_range, latitude)
+        mid = (value_range[0] + value_range[1]) / 2
+        if value >= mid:
+            ch |= 1 << (4 - bit)
+            value_range[0] = mid
+        else:
+            value_range[1] = mid
+        even = not even
+        if bit < 4:
+            bit += 1
+        else:
+            geohash.append(_GEOHASH_BASE32[ch])
+            bit, ch = 0, 0
+    return "".join(geohash)
+
+
+def radius_bucket(radius) -> int:
+    """
+    Buckets a search radius (meters) on a log2 scale so nearby radii share cache entries.
+    """
+    return int(math.ceil(math.log2(max(float(radius), 1.0))))
+
+
+def haversine_distances(origin_latitude, origin_longitude, latitudes, longitudes, decimals=2):
+    """
+    Great-circle distances in miles from one origin to many points in a single NumPy pass.
+
+    Args:
+        origin_latitude (float)
+        origin_longitude (float)
+        latitudes (array-like): point latitudes, None becomes NaN
+        longitudes (array-like): point longitudes, None becomes NaN
+        decimals (int): rounding applied to the result
+
+    Returns:
+        np.ndarray: distances in miles, NaN where a point has no coordinates
+    """
+    lat1 = math.radians(float(origin_latitude))
+    lng1 = math.radians(float(origin_longitude))
+    lat2 = np.radians(np.asarray(latitudes, dtype=float))
+    lng2 = np.radians(np.asarray(longitudes, dtype=float))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return np.round(EARTH_RADIUS_MILES * c, decimals)
+
+
+def argsort_by_distance(distances) -> np.ndarray:
+    """
+    Stable ascending order of distances; NaN (unknown) distances sort last.
+    """
+    return np.argsort(np.asarray(distances, dtype=float), kind="stable")
+
+
+def top_k_by_distance(distances, k: int) -> np.ndarray:
+    """
+    Indices of the k nearest points in ascending order, without sorting the whole array.
+    """
+    distances = np.asarray(distances, dtype=float)
+    if k <= 0:
+        return np.array([], dtype=int)
+    if k >= len(distances):
+        return argsort_by_distance(distances)
+    # Keep NaN at the end so unknown distances never win a top-k slot
+    keys = np.where(np.isnan(distances), np.inf, distances)
+    nearest = np.sort(np.argpartition(keys, k - 1)[:k])
+    return nearest[np.argsort(keys[nearest], kind="stable")]
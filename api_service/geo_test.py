@@ -0,0 +1,25 @@
+import math
+import unittest
+from geo import encode_geohash, haversine_distances, argsort_by_distance, top_k_by_distance
+
+
+class TestGeo(unittest.TestCase):
+
+    def test_encode_geohash(self):
+        self.assertEqual(encode_geohash(57.64911, 10.40744, 11), "u4pruydqqvj")
+        self.assertEqual(encode_geohash(37.7749, -122.4194, 6), "9q8yyk")
+
+    def test_haversine_distances(self):
+        distances = haversine_distances(37.7749, -122.4194, [37.7749, 34.0522, None], [-122.4194, -118.2437, None])
+        self.assertEqual(distances[0], 0)
+        self.assertAlmostEqual(distances[1], 347.4, delta=0.5)
+        self.assertTrue(math.isnan(distances[2]))
+
+    def test_sort_and_top_k(self):
+        distances = [3.0, float("nan"), 1.0, 2.0, 1.0]
+        self.assertEqual(list(argsort_by_distance(distances)), [2, 4, 3, 0, 1])
+        self.assertEqual(list(top_k_by_distance(distances, 2)), [2, 4])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,5 @@
-from flask import jsonify
+import json
+from flask import jsonify, Response, stream_with_context
 
 def api_response(success=False, data=None, status=200, message=None, error=None):
     """
@@ -16,4 +17,22 @@ def api_response(success=False, data=None, status=200, message=None, error=None)
         'message': message,
         'error': error
     }
-    return jsonify(response), status
\ No newline at end of file
+    return jsonify(response), status
+
+
+def sse_response(events):
+    """
+    Helper function to stream events to the client as Server-Sent Events.
+    :param events: Iterable of (event_name, data) pairs; data is sent JSON encoded
+    :return: text/event-stream response, generated while the request context stays available
+    """
+    def generate():
+        for event, data in events:
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,126 @@
+import time
+import codecs
+from html.parser import HTMLParser
+
+# Budgets for a single page: parsing stops as soon as either is reached
+MAX_BYTES = 1024 * 1024
+MAX_WORDS = 3000
+MAX_SECONDS = 15
+CHUNK_SIZE = 16 * 1024
+
+
+class _TextExtractor(HTMLParser):
+    """
+    Collects visible text while parsing, ignoring everything inside SKIP_TAGS.
+    """
+
+    SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "nav", "iframe"}
+
+    def __init__(self, max_words: int):
+        super().__init__(convert_charrefs=True)
+        self.max_words = max_words
+        self.words = []
+        # Text of the current node; it can arrive in pieces split mid-word
+        self._pending = []
+        self._skip_depth = 0
+
+    @property
+    def done(self) -> bool:
+        return len(self.words) >= self.max_words
+
+    def flush(self):
+        if self._pending and not self.done:
+            self.words.extend("".join(self._pending).split()[: self.max_words - len(self.words)])
+        self._pending = []
+
+    def handle_starttag(self, tag, attrs):
+        self.flush()
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        self.flush()
+        if tag in self.SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self._skip_depth and not self.done:
+            self._pending.append(data)
+
+
+def extract_text(chunks, encoding: str = "utf-8", max_bytes: int = MAX_BYTES, max_words: int = MAX_WORDS, deadline: float = None) -> str:
+    """
+    Extracts visible text from an HTML byte stream without building a document tree.
+
+    Args:
+        chunks (iterable): bytes chunks of the document
+        encoding (str): document encoding, undecodable bytes are replaced
+        max_bytes (int): stop reading after this many bytes
+        max_words (int): stop reading once this many words were collected
+        deadline (float): time.monotonic() value after which reading stops
+
+    Returns:
+        str: the collected words separated by single spaces
+    """
+    parser = _TextExtractor(max_words)
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    read = 0
+    for chunk in chunks:
+        chunk = chunk[: max_bytes - read]
+        read += len(chunk)
+        parser.feed(decoder.decode(chunk))
+        if parser.done or read >= max_bytes or (deadline is not None and time.monotonic() >= deadline):
+            break
+    parser.close()
+    parser.flush()
+    return " ".join(parser.words)
+
+
+def _response_encoding(response) -> str:
+    # requests falls back to ISO-8859-1 for text/* without a charset, most pages are UTF-8
+    content_type = response.headers.get("Content-Type", "")
+    if "charset=" in content_type.lower() and response.encoding:
+        try:
+            return codecs.lookup(response.encoding).name
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+def fetch_page_text(session, url: str, headers: dict = None, timeout=(3.05, 10), max_bytes: int = MAX_BYTES, max_words: int = MAX_WORDS, max_seconds: float = MAX_SECONDS):
+    """
+    Streams a page and extracts its visible text within the given budgets.
+
+    Args:
+        session (requests.Session): session used for the request
+        url (str): page URL
+        headers (dict): extra request headers, e.g. conditional request validators
+        timeout (tuple): (connect, read) timeouts in seconds
+        max_bytes (int): maximum bytes read from the body
+        max_words (int): maximum words extracted
+        max_seconds (float): total time budget for reading the body
+
+    Returns:
+        tuple: (response, text); text is "" for 304 responses and non-HTML content
+
+    Raises:
+        requests.RequestException: on connection errors, timeouts and 4xx/5xx responses
+    """
+    response = session.get(url, headers=headers, timeout=timeout, stream=True)
+    try:
+        if response.status_code == 304:
+            return response, ""
+        response.raise_for_status()
+        content_type = response.headers.get("Content-Type", "text/html").lower()
+        if "html" not in content_type and "text/plain" not in content_type:
+            return response, ""
+        text = extract_text(
+            response.iter_content(CHUNK_SIZE),
+            encoding=_response_encoding(response),
+            max_bytes=max_bytes,
+            max_words=max_words,
+            deadline=time.monotonic() + max_seconds,
+        )
+        return response, text
+    finally:
+        response.close()
@@ -0,0 +1,33 @@
+import unittest
+from html_extractor import extract_text
+
+PAGE = (
+    b"<html><head><style>body { color: red; }</style><script>var x = '<p>no</p>';</script></head>"
+    b"<body><nav><a href='/'>Home</a> <a href='/menu'>Menu</a></nav>"
+    b"<h1>Caf\xc3\xa9 Luna</h1><p>Fresh bread &amp; coffee since 1952.</p></body></html>"
+)
+
+
+class TestExtractText(unittest.TestCase):
+
+    def test_skips_script_style_and_nav(self):
+        self.assertEqual(extract_text([PAGE]), "Café Luna Fresh bread & coffee since 1952.")
+
+    def test_multibyte_characters_split_across_chunks(self):
+        chunks = [PAGE[i:i + 7] for i in range(0, len(PAGE), 7)]
+        self.assertEqual(extract_text(chunks), extract_text([PAGE]))
+
+    def test_word_budget(self):
+        self.assertEqual(extract_text([PAGE], max_words=3), "Café Luna Fresh")
+
+    def test_byte_budget_stops_reading(self):
+        def chunks():
+            yield b"<p>" + b"word " * 100 + b"</p>"
+            raise AssertionError("read past the byte budget")
+
+        # 3 bytes of markup, then 19 full words and the cut-off "wo"
+        self.assertEqual(len(extract_text(chunks(), max_bytes=100).split()), 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import logging
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class JobQueue:
+    """
+    In-process background job runner with pollable status.
+
+    Jobs run on a thread pool and receive a `progress` callback to report what
+    they are doing. Submitting a job with the key of a job that is still queued
+    or running returns the existing job instead of starting another one.
+    Finished jobs are kept for `ttl` seconds so clients can fetch the result.
+    """
+
+    MAX_WORKERS = 4
+    TTL = 60 * 60
+
+    def __init__(self, max_workers: int = MAX_WORKERS, ttl: float = TTL):
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._active_by_key = {}
+
+    def submit(self, fn, *args, key=None, **kwargs) -> str:
+        """
+        Runs fn(*args, progress=<callback>, **kwargs) in the background.
+
+        Args:
+            fn (callable): job function, its return value becomes the job result
+            key (hashable): optional deduplication key
+
+        Returns:
+            str: job ID
+        """
+        with self._lock:
+            self._prune()
+            if key is not None and key in self._active_by_key:
+                return self._active_by_key[key]
+            job_id = uuid.uuid4().hex
+            now = time.time()
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "status": QUEUED,
+                "progress": None,
+                "result": None,
+                "error": None,
+                "created_at": now,
+                "updated_at": now,
+            }
+            if key is not None:
+                self._active_by_key[key] = job_id
+        self._executor.submit(self._run, job_id, key, fn, args, kwargs)
+        return job_id
+
+    def get(self, job_id: str):
+        """
+        Returns:
+            dict or None: a copy of the job status, None for unknown or expired jobs
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields, updated_at=time.time())
+
+    def _run(self, job_id, key, fn, args, kwargs):
+        self._update(job_id, status=RUNNING)
+        try:
+            result = fn(*args, progress=lambda message: self._update(job_id, progress=message), **kwargs)
+            self._update(job_id, status=SUCCEEDED, result=result)
+        except Exception as e:
+            logger.exception(f"Job {job_id} failed")
+            self._update(job_id, status=FAILED, error=str(e))
+        finally:
+            with self._lock:
+                if key is not None and self._active_by_key.get(key) == job_id:
+                    del self._active_by_key[key]
+
+    def _prune(self):
+        oldest_allowed = time.time() - self.ttl
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job["status"] in (SUCCEEDED, FAILED) and job["updated_at"] < oldest_allowed
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {QUEUED: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0}
+            for job in self._jobs.values():
+                counts[job["status"]] += 1
+            return counts
@@ -0,0 +1,53 @@
+import time
+import threading
+import unittest
+from jobs import JobQueue, SUCCEEDED, FAILED
+
+
+def wait_for(queue, job_id, timeout=2):
+    deadline = time.monotonic() + timeout
+    while queue.get(job_id)["status"] not in (SUCCEEDED, FAILED) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return queue.get(job_id)
+
+
+class TestJobQueue(unittest.TestCase):
+
+    def test_result_and_progress(self):
+        queue = JobQueue()
+
+        def work(value, progress):
+            progress("halfway")
+            return value * 2
+
+        job = wait_for(queue, queue.submit(work, 21))
+        self.assertEqual(job["status"], SUCCEEDED)
+        self.assertEqual(job["result"], 42)
+        self.assertEqual(job["progress"], "halfway")
+
+    def test_failure_is_reported(self):
+        queue = JobQueue()
+
+        def work(progress):
+            raise ValueError("boom")
+
+        job = wait_for(queue, queue.submit(work))
+        self.assertEqual(job["status"], FAILED)
+        self.assertEqual(job["error"], "boom")
+
+    def test_active_job_is_deduplicated_by_key(self):
+        queue = JobQueue()
+        release = threading.Event()
+
+        def work(progress):
+            release.wait(1)
+
+        first = queue.submit(work, key="place--user")
+        self.assertEqual(queue.submit(work, key="place--user"), first)
+        release.set()
+        wait_for(queue, first)
+        self.assertNotEqual(queue.submit(work, key="place--user"), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
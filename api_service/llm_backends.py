@@ -0,0 +1,183 @@
+import os
+import re
+import json
+import time
+import random
+import hashlib
+from abc import ABC, abstractmethod
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class LLMBackend(ABC):
+    """
+    Text generation backend used by LLMTools.
+
+    Backends only generate text; caching, coalescing, rate limiting and retries
+    stay in LLMTools. Errors carrying an HTTP status in `.code` (429, 5xx) are
+    retried there. Offline backends also turn off Google Search in LLMTools.
+    """
+
+    model_id = None
+    offline = False
+
+    @abstractmethod
+    def generate(self, prompt: str, call_site: str = None, response_schema: dict = None, timeout: float = None) -> str:
+        """
+        Args:
+            prompt (str): the prompt
+            call_site (str): LLMTools call site that built the prompt
+            response_schema (dict): optional JSON schema the response must follow
+            timeout (float): request timeout in seconds
+
+        Returns:
+            str: the response text
+        """
+
+    @abstractmethod
+    def stream(self, prompt: str, call_site: str = None, timeout: float = None):
+        """Yields the response text chunk by chunk."""
+
+
+class GeminiBackend(LLMBackend):
+
+    def __init__(self, model_id: str, api_key: str):
+        # Imported here so the fake backend runs without the Gemini SDK
+        import google.generativeai as genai
+
+        self._genai = genai
+        self.model_id = model_id
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_id)
+
+    def generate(self, prompt, call_site=None, response_schema=None, timeout=None):
+        generation_config = None
+        if response_schema is not None:
+            generation_config = self._genai.GenerationConfig(
+                response_mime_type="application/json", response_schema=response_schema
+            )
+        response = self.model.generate_content(
+            prompt, generation_config=generation_config, request_options={"timeout": timeout}
+        )
+        return response.text
+
+    def stream(self, prompt, call_site=None, timeout=None):
+        for chunk in self.model.generate_content(prompt, stream=True, request_options={"timeout": timeout}):
+            yield chunk.text
+
+
+_PLACE_ID_PATTERN = re.compile(r'"place_id":\s*"([^"]+)"')
+_SEARCH_QUERY_PATTERN = re.compile(r'search bar:\s*"(.*)"')
+_PLACE_TITLE_PATTERN = re.compile(r"interesting facts? .*?about (.+?) for the user")
+_FILLER_WORDS = (
+    "a curious and easygoing explorer who enjoys quiet museums, leafy parks, local markets and "
+    "small independent cafes, and who likes to hear the story behind every place they visit"
+).split()
+
+
+class FakeLLMBackend(LLMBackend):
+    """
+    Offline stand-in for Gemini, for load tests and profiling without a quota.
+
+    Responses are canned per call site and deterministic for a given prompt, in
+    the shape the LLMTools parsers expect. Each call takes `latency` seconds
+    plus the time to produce its tokens at `tokens_per_second`. It is offline,
+    so place details never spend Custom Search quota: when the canned content
+    check answers NO, the web search step finds nothing.
+    """
+
+    model_id = "fake"
+    offline = True
+    LATENCY = 0.5
+    TOKENS_PER_SECOND = 100
+    # Words in free-text responses (user description, interesting facts)
+    TEXT_WORDS = 120
+
+    def __init__(self, latency: float = LATENCY, tokens_per_second: float = TOKENS_PER_SECOND):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+
+    @staticmethod
+    def _random(prompt: str) -> random.Random:
+        return random.Random(hashlib.sha256(prompt.encode("utf-8")).digest())
+
+    def _text(self, rng: random.Random, subject: str) -> str:
+        words = [rng.choice(_FILLER_WORDS) for _ in range(self.TEXT_WORDS)]
+        return f"{subject} suits you: " + " ".join(words) + "."
+
+    def respond(self, prompt: str, call_site: str = None, response_schema: dict = None) -> str:
+        """
+        Returns:
+            str: the canned response for the call site, without any simulated delay
+        """
+        rng = self._random(prompt)
+        place_types = (response_schema or {}).get("items", {}).get("enum") or (
+            (response_schema or {}).get("properties", {}).get("types", {}).get("items", {}).get("enum", [])
+        )
+
+        if call_site == "place_types":
+            return json.dumps(rng.sample(place_types, min(6, len(place_types))))
+        if call_site == "text_queries":
+            return ", ".join(rng.sample(
+                ["rooftop bars near me", "hidden gems nearby", "quiet cafes near me", "art galleries nearby",
+                 "scenic hiking trails near me", "local food markets nearby", "live music venues near me"],
+                4,
+            ))
+        if call_site == "parse_query":
+            query = _SEARCH_QUERY_PATTERN.search(prompt)
+            if query and rng.random() < 0.5:
+                return json.dumps({"use_text_search": True, "text_query": query.group(1)})
+            return json.dumps({"use_text_search": False, "types": rng.sample(place_types, min(3, len(place_types)))})
+        if call_site == "filter_places":
+            return ", ".join(list(dict.fromkeys(_PLACE_ID_PATTERN.findall(prompt)))[:12])
+        if call_site == "content_check":
+            return "YES" if rng.random() < 0.7 else "NO"
+        title = _PLACE_TITLE_PATTERN.search(prompt)
+        title = title.group(1) if title else "This place"
+        if call_site == "search_query":
+            return f"{title} history and interesting facts"
+        if call_site == "interesting_facts":
+            return self._text(rng, title)
+        return self._text(rng, "A day out")
+
+    def _sleep_for(self, text: str, timeout: float = None):
+        # Roughly 4 characters per token, as in prompt_builder
+        delay = self.latency + len(text) / 4 / self.tokens_per_second
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Fake LLM call exceeded {timeout}s")
+        time.sleep(delay)
+
+    def generate(self, prompt, call_site=None, response_schema=None, timeout=None):
+        response = self.respond(prompt, call_site, response_schema)
+        self._sleep_for(response, timeout)
+        return response
+
+    def stream(self, prompt, call_site=None, timeout=None):
+        response = self.respond(prompt, call_site)
+        time.sleep(self.latency)
+        words = response.split(" ")
+        for start in range(0, len(words), 8):
+            chunk = " ".join(words[start:start + 8]) + " "
+            time.sleep(len(chunk) / 4 / self.tokens_per_second)
+            yield chunk
+
+
+def create_llm_backend(model_id: str) -> LLMBackend:
+    """
+    Backend selected by LLM_BACKEND: "gemini" (default) reads GEMINI_API_KEY from
+    the GOOGLE_KEY file, "fake" is configured by FAKE_LLM_LATENCY and
+    FAKE_LLM_TOKENS_PER_SECOND.
+    """
+    backend = os.getenv("LLM_BACKEND", "gemini").lower()
+    if backend == "fake":
+        logger.warning("Using the fake LLM backend, responses are canned")
+        return FakeLLMBackend(
+            latency=float(os.getenv("FAKE_LLM_LATENCY", FakeLLMBackend.LATENCY)),
+            tokens_per_second=float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", FakeLLMBackend.TOKENS_PER_SECOND)),
+        )
+    if backend != "gemini":
+        raise ValueError(f"Unknown LLM_BACKEND: {backend}")
+    with open(os.getenv("GOOGLE_KEY")) as f:
+        return GeminiBackend(model_id, json.load(f)["GEMINI_API_KEY"])
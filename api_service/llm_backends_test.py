@@ -0,0 +1,50 @@
+import json
+import time
+import unittest
+from llm_backends import FakeLLMBackend
+from structured_output import place_types_schema, query_parse_schema, parse_place_types, parse_query_parse
+
+PLACE_TYPES = ["museum", "park", "cafe", "zoo", "library", "spa", "bar"]
+
+
+class TestFakeLLMBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = FakeLLMBackend(latency=0, tokens_per_second=1e6)
+
+    def test_structured_responses_parse(self):
+        place_types = self.backend.generate("prompt", "place_types", place_types_schema(PLACE_TYPES))
+        self.assertEqual(len(parse_place_types(place_types, PLACE_TYPES)), 6)
+
+        prompt = 'The user has provided the following query on the app search bar:\n        "quiet places to read"'
+        parsed = parse_query_parse(
+            self.backend.generate(prompt, "parse_query", query_parse_schema(PLACE_TYPES)), "quiet places to read", PLACE_TYPES
+        )
+        if parsed["use_text_search"]:
+            self.assertEqual(parsed["text_query"], "quiet places to read")
+        else:
+            self.assertTrue(set(parsed["types"]) <= set(PLACE_TYPES))
+
+    def test_filter_returns_place_ids_from_the_prompt(self):
+        places = json.dumps([{"place_id": f"id{i}", "title": f"Place {i}"} for i in range(20)])
+        response = self.backend.generate(f"Here are some potential places to recommend:\n{places}", "filter_places")
+        self.assertEqual(response.split(", "), [f"id{i}" for i in range(12)])
+
+    def test_responses_are_deterministic(self):
+        prompt = "write about the personalized interesting fact about Tate Modern for the user"
+        first = self.backend.generate(prompt, "interesting_facts")
+        self.assertEqual(first, self.backend.generate(prompt, "interesting_facts"))
+        self.assertTrue(first.startswith("Tate Modern"))
+        self.assertEqual("".join(self.backend.stream(prompt, "interesting_facts")).strip(), first)
+
+    def test_latency_and_timeout(self):
+        backend = FakeLLMBackend(latency=0.05, tokens_per_second=1e6)
+        start = time.monotonic()
+        backend.generate("prompt", "content_check")
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+        with self.assertRaises(TimeoutError):
+            backend.generate("prompt", "content_check", timeout=0.01)
+
+
+if __name__ == "__main__":
+    unittest.main()
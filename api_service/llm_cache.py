@@ -0,0 +1,116 @@
+import time
+import hashlib
+import threading
+from cache import TTLCache
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Collapses whitespace so prompts that differ only in indentation or line
+    breaks (e.g. the same f-string template) share a cache entry.
+    """
+    return " ".join(prompt.split())
+
+
+def prompt_cache_key(model_id: str, prompt: str) -> str:
+    normalized = normalize_prompt(prompt)
+    return hashlib.sha256(f"{model_id}\n{normalized}".encode("utf-8")).hexdigest()
+
+
+class FirestoreResponseStorage:
+    """
+    Persistent tier for LLMResponseCache, one document per prompt key.
+
+    Any object with the same get(key) / set(key, value, ttl) / delete(key)
+    methods can be used as a storage tier instead.
+    """
+
+    COLLECTION = "llm_cache"
+
+    def __init__(self, data_retriever, collection: str = COLLECTION):
+        self.data_retriever = data_retriever
+        self.collection = collection
+
+    def get(self, key: str):
+        """
+        Returns:
+            tuple or None: (response, expires_at) or None if missing or expired
+        """
+        document = self.data_retriever.fetch_document_by_id(self.collection, key)
+        if not document or document.get("expires_at", 0) <= time.time():
+            return None
+        return document["response"], document["expires_at"]
+
+    def set(self, key: str, value: str, ttl: float):
+        self.data_retriever.write_to_collection_with_id(
+            self.collection, key, {"response": value, "expires_at": time.time() + ttl}
+        )
+
+    def delete(self, key: str):
+        self.data_retriever.delete_document_by_id(self.collection, key)
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache of LLM responses keyed by model ID + normalized prompt hash.
+
+    Lookups hit the in-memory LRU first, then the optional persistent storage;
+    storage hits are promoted to memory for their remaining lifetime. Storage
+    errors are logged and treated as misses so the cache never fails a call.
+    """
+
+    def __init__(self, storage=None, maxsize: int = 2048, ttl: float = 24 * 60 * 60):
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.storage = storage
+        self._lock = threading.Lock()
+        self.storage_hits = 0
+        self.storage_misses = 0
+
+    def get(self, key: str):
+        """
+        Returns:
+            str or None: the cached response
+        """
+        value = self.memory.get(key)
+        if value is not None or self.storage is None:
+            return value
+
+        try:
+            stored = self.storage.get(key)
+        except Exception as e:
+            logger.warning(f"LLM cache storage read failed: {e}")
+            stored = None
+        with self._lock:
+            if stored is None:
+                self.storage_misses += 1
+                return None
+            self.storage_hits += 1
+        value, expires_at = stored
+        self.memory.set(key, value, ttl=max(expires_at - time.time(), 0))
+        return value
+
+    def set(self, key: str, value: str, ttl: float):
+        self.memory.set(key, value, ttl=ttl)
+        if self.storage is None:
+            return
+        try:
+            self.storage.set(key, value, ttl)
+        except Exception as e:
+            logger.warning(f"LLM cache storage write failed: {e}")
+
+    def delete(self, key: str):
+        self.memory.delete(key)
+        if self.storage is None:
+            return
+        try:
+            self.storage.delete(key)
+        except Exception as e:
+            logger.warning(f"LLM cache storage delete failed: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            storage_stats = {"hits": self.storage_hits, "misses": self.storage_misses}
+        return {"memory": self.memory.stats(), "storage": storage_stats}
@@ -0,0 +1,48 @@
+import time
+import unittest
+from llm_cache import LLMResponseCache, prompt_cache_key
+
+
+class DictStorage:
+
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, value, ttl):
+        self.entries[key] = (value, time.time() + ttl)
+
+    def delete(self, key):
+        self.entries.pop(key, None)
+
+
+class TestLLMResponseCache(unittest.TestCase):
+
+    def test_key_ignores_whitespace_but_not_model(self):
+        key = prompt_cache_key("model-a", "\n    Find   coffee\n    near me\n")
+        self.assertEqual(key, prompt_cache_key("model-a", "Find coffee near me"))
+        self.assertNotEqual(key, prompt_cache_key("model-b", "Find coffee near me"))
+
+    def test_storage_hit_is_promoted_to_memory(self):
+        storage = DictStorage()
+        LLMResponseCache(storage=storage).set("key", "response", ttl=60)
+
+        cache = LLMResponseCache(storage=storage)
+        self.assertEqual(cache.get("key"), "response")
+        storage.entries.clear()
+        self.assertEqual(cache.get("key"), "response")
+        self.assertEqual(cache.stats()["storage"]["hits"], 1)
+
+    def test_delete_removes_both_tiers(self):
+        storage = DictStorage()
+        cache = LLMResponseCache(storage=storage)
+        cache.set("key", "bad response", ttl=60)
+        cache.delete("key")
+        self.assertIsNone(cache.get("key"))
+        self.assertEqual(storage.entries, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
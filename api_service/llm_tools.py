@@ -2,15 +2,28 @@ import os
 import re
 import json
 import time
-import random
+import threading
+from contextlib import contextmanager
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, wait
 from data_retriever import DataRetriever
-import google.generativeai as genai
-from google.cloud.firestore_v1._helpers import DatetimeWithNanoseconds
-from bs4 import BeautifulSoup
-from langchain_community.document_loaders import WebBaseLoader
 from langchain_core.tools import Tool
 from langchain_google_community import GoogleSearchAPIWrapper
 from cleantext import clean
+from cache import TTLCache
+from rate_limiter import AdaptiveRateLimiter, AdaptiveConcurrencyLimiter, INTERACTIVE, BACKGROUND, backoff_delay
+from scrape_cache import ScrapeCache
+from html_extractor import fetch_page_text
+from text_retrieval import select_relevant_chunks
+from place_ranker import rank_places
+from query_classifier import QueryClassifier
+from prompt_builder import PromptBuilder, compact_json, truncate_words
+from structured_output import place_types_schema, query_parse_schema, parse_place_types, parse_query_parse
+from llm_backends import LLMBackend, create_llm_backend
+from llm_cache import LLMResponseCache, FirestoreResponseStorage, prompt_cache_key
+from single_flight import SingleFlight
+from user_profile import UserProfileStore
 
 import logging
 logging.basicConfig(level=logging.DEBUG)
@@ -22,6 +35,42 @@ def clean_text(text):
     text = re.sub(r'\W+', ' ', text)
     return clean(text)
 
+
+# Shared by all requests, in place of fixed sleeps between Gemini and search calls
+gemini_rate_limiter = AdaptiveRateLimiter(rate=2, min_rate=0.2, max_rate=10)
+search_rate_limiter = AdaptiveRateLimiter(rate=1, min_rate=0.1, max_rate=5)
+# Gemini calls in flight across all requests; interactive calls are admitted before background ones
+gemini_concurrency_limiter = AdaptiveConcurrencyLimiter(limit=4, min_limit=1, max_limit=16)
+# Quota, server and deadline errors are worth retrying
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def _status_code(error):
+    # google.api_core errors carry the HTTP code in .code, googleapiclient errors in .resp.status
+    code = getattr(error, "code", None)
+    return code if isinstance(code, int) else getattr(getattr(error, "resp", None), "status", None)
+
+
+def _is_throttled(error):
+    return _status_code(error) == 429
+
+
+def _is_retryable(error):
+    return isinstance(error, TimeoutError) or _status_code(error) in RETRYABLE_STATUS_CODES
+
+
+def _call_rate_limited(rate_limiter, fn, *args, **kwargs):
+    rate_limiter.acquire()
+    try:
+        result = fn(*args, **kwargs)
+    except Exception as e:
+        if _is_throttled(e):
+            rate_limiter.on_throttle()
+        raise
+    rate_limiter.on_success()
+    return result
+
+
 class LLMTools:
 
     MODEL_ID = "gemini-1.5-pro-001"
@@ -46,75 +95,271 @@ class LLMTools:
         "wedding_venue", "zoo"
     ]
     SAVED_PLACES_LIMIT = 50
-
-    def __init__(self, data_retriever: DataRetriever):
+    NOT_ENOUGH_USER_INFO_MESSAGE = "Hi, there is not enough information about you. Please add a brief description about your preferences below!"
+    # Candidates kept by the local ranker before the filter prompts (which pick 12)
+    PRE_RANK_TOP_K = 24
+    # Text queries and place types depend only on the user profile, so they are
+    # reused until the profile version changes. Entries older than
+    # PROFILE_RESULTS_REFRESH_AFTER are served and regenerated in the background.
+    PROFILE_RESULTS_CACHE_SIZE = 2000
+    PROFILE_RESULTS_TTL = 24 * 60 * 60
+    PROFILE_RESULTS_REFRESH_AFTER = 6 * 60 * 60
+    BACKGROUND_REFRESH = True
+    # Time budget for scraping and searching in process_place_details
+    PLACE_DETAILS_DEADLINE = 25
+    SCRAPE_WORKERS = 16
+    SCRAPE_TIMEOUT = (3.05, 10)
+    # Scraped pages are stored cleaned and cut to this many words
+    MAX_SCRAPED_WORDS = 3000
+    # Words of scraped content, across all sources, that go into the place details prompts
+    SCRAPED_CONTEXT_WORDS = 1500
+    SCRAPE_HEADERS = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+        "Accept": "text/html,application/xhtml+xml",
+    }
+    # Response cache TTL per _call_llm call site. Call sites not listed here
+    # (the user description and interesting facts, which should stay fresh)
+    # always go to the model. Place types and text queries are memoized per
+    # profile instead, so their background refresh reaches the model.
+    LLM_CACHE_TTLS = {
+        "parse_query": 7 * 24 * 60 * 60,
+        "content_check": 24 * 60 * 60,
+        "search_query": 24 * 60 * 60,
+        "filter_places": 15 * 60,
+    }
+    # Gemini call limits: per-call timeout, retries with jittered exponential
+    # backoff, and how long a call may queue for a concurrency slot
+    LLM_TIMEOUT = 30
+    LLM_MAX_RETRIES = 3
+    LLM_BACKOFF_BASE = 0.5
+    LLM_BACKOFF_CAP = 8
+    LLM_QUEUE_TIMEOUT = 60
+    # Overrides for prompt_builder.DEFAULT_SECTION_BUDGETS (tokens per prompt section)
+    PROMPT_SECTION_BUDGETS = {}
+    # Reviews are cut to this many words in the prompts, the opening usually says enough
+    REVIEW_MAX_WORDS = 60
+
+    def __init__(self, data_retriever: DataRetriever, backend: LLMBackend = None):
+        """
+        Args:
+            data_retriever (DataRetriever): Firestore access
+            backend (LLMBackend): text generation backend, defaults to the one selected by LLM_BACKEND
+        """
         self.data_retriever = data_retriever
-        with open(os.getenv("GOOGLE_KEY")) as f:
-            keys = json.load(f)
-            os.environ["GOOGLE_API_KEY"] = keys["GOOGLE_API_KEY"]
-            os.environ["GOOGLE_CSE_ID"] = keys["GOOGLE_CSE_ID"]
-            self.GEMINI_API_KEY = keys["GEMINI_API_KEY"]
-        genai.configure(api_key=self.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel(self.MODEL_ID)
+        # The Google Search keys are optional when running offline with the fake backend
+        if os.getenv("GOOGLE_KEY"):
+            with open(os.getenv("GOOGLE_KEY")) as f:
+                keys = json.load(f)
+                os.environ["GOOGLE_API_KEY"] = keys["GOOGLE_API_KEY"]
+                os.environ["GOOGLE_CSE_ID"] = keys["GOOGLE_CSE_ID"]
+        self.backend = backend or create_llm_backend(self.MODEL_ID)
+        # Identical prompts issued concurrently share one Gemini call
+        self.single_flight = SingleFlight()
+        self.response_cache = LLMResponseCache(storage=FirestoreResponseStorage(data_retriever))
+        self.profile_store = UserProfileStore(data_retriever)
+        self.query_classifier = QueryClassifier(self.POSSIBLE_PLACE_TYPES)
+        self.prompt_builder = PromptBuilder(self.PROMPT_SECTION_BUDGETS)
+        self.profile_results_cache = TTLCache(
+            maxsize=self.PROFILE_RESULTS_CACHE_SIZE, ttl=self.PROFILE_RESULTS_TTL
+        )
+        self._refresh_executor = ThreadPoolExecutor(max_workers=2)
+        self._scrape_executor = ThreadPoolExecutor(max_workers=self.SCRAPE_WORKERS)
+        self.scrape_session = self._create_scrape_session()
+        self.scrape_cache = ScrapeCache()
+        self._refreshing = set()
+        self._refreshing_lock = threading.Lock()
+        self._priority = threading.local()
 
     def test_api(self):
-        response = self.model.generate_content("Write a story about an AI")
-        return response.text
+        return self.backend.generate("Write a story about an AI")
 
-    def _call_llm(self, prompt):
-        response = self.model.generate_content(prompt)
-        return response.text.strip()
+    def _call_llm(self, prompt, call_site: str = None, response_schema: dict = None):
+        """
+        Args:
+            prompt (str): the prompt
+            call_site (str): caller name, selects the response cache TTL (see LLM_CACHE_TTLS)
+            response_schema (dict): optional JSON schema the response must follow (see structured_output)
 
-    def _get_relevant_user_info(self, email: str, limit: int, include_description: bool):
+        Returns:
+            str: the response text
+        """
+        self.prompt_builder.record(call_site, prompt)
+        key = self._llm_cache_key(prompt, response_schema)
+        ttl = self.LLM_CACHE_TTLS.get(call_site)
+        if ttl:
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                return cached
+
+        response = self.single_flight.do(key, self._generate, prompt, response_schema, call_site)
+        if ttl and response:
+            self.response_cache.set(key, response, ttl)
+        return response
+
+    def _llm_cache_key(self, prompt, response_schema=None):
+        if response_schema is not None:
+            prompt = f"{prompt}\n{json.dumps(response_schema, sort_keys=True)}"
+        # Keyed by the backend's model so fake responses never reach real traffic
+        return prompt_cache_key(self.backend.model_id, prompt)
+
+    def _forget_llm_response(self, prompt, response_schema=None):
+        """Drops a cached response that turned out to be unusable so the next call regenerates it."""
+        self.response_cache.delete(self._llm_cache_key(prompt, response_schema))
+
+    @contextmanager
+    def background_priority(self):
+        """
+        Marks the Gemini calls made by the current thread inside the block as
+        background work, which waits behind interactive calls for a slot.
+        """
+        previous = getattr(self._priority, "value", INTERACTIVE)
+        self._priority.value = BACKGROUND
+        try:
+            yield
+        finally:
+            self._priority.value = previous
 
-        relevant_info = {}
-        # Visited places (get half restaurants half non restaurants since most visited places are restaurants)
-        visited_places = self.data_retriever.fetch_document_by_criteria("saved_places", "user_email", email)
-        visited_places_other_than_restaurants = [visit for visit in visited_places if "food" not in visit.get("types", []) and "restaurant" not in visit.get("types", [])]
-        visited_places_other_than_restaurants = [
-            {
-                "title": place.get("title", ""),
-                "types": place.get("types", []),
-                "note": place.get("note", ""),
-                "place_description": place.get("place_description", ""),
-                "comment": place.get("comment", "")
-            } for place in visited_places_other_than_restaurants
-        ]
-        if len(visited_places_other_than_restaurants) > limit // 2:
-            visited_places_other_than_restaurants = random.sample(visited_places_other_than_restaurants, limit // 2)
+    def _acquire_llm_slot(self):
+        priority = getattr(self._priority, "value", INTERACTIVE)
+        if not gemini_concurrency_limiter.acquire(priority, timeout=self.LLM_QUEUE_TIMEOUT):
+            raise TimeoutError("Timed out waiting for a Gemini slot")
 
-        visited_places_restaurants = [visit for visit in visited_places if "food" in visit.get("types", []) or "restaurant" in visit.get("types", [])]
-        visited_places_restaurants = [
-            {
-                "title": place.get("title", ""),
-                "types": place.get("types", []),
-                "note": place.get("note", ""),
-                "place_description": place.get("place_description", ""),
-                "comment": place.get("comment", "")
-            } for place in visited_places_restaurants
-        ]
-        if len(visited_places_restaurants) > limit // 2:
-            visited_places_restaurants = random.sample(visited_places_restaurants, limit // 2)
-
-        visited_place_combined = visited_places_other_than_restaurants + visited_places_restaurants
-        def custom_serializer(obj):
-            if isinstance(obj, DatetimeWithNanoseconds):
-                return obj.isoformat()
-            raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
-        visited_place_combined_str = json.dumps({"visited places": visited_place_combined}, default=custom_serializer)
-        relevant_info["visited_places"] = visited_place_combined_str
-
-        # Interests
-        user_data = self.data_retriever.fetch_document_by_id("users", email)
-        interests = user_data.get("interests", [])
-        interests_str = json.dumps({"interests": interests})
-        relevant_info["interests"] = interests_str
+    def _retry_delay(self, error, attempt):
+        """
+        Records a failed Gemini call with the limiters.
+
+        Returns:
+            float or None: seconds to wait before retrying, None if the call should not be retried
+        """
+        if _is_throttled(error):
+            gemini_rate_limiter.on_throttle()
+            gemini_concurrency_limiter.on_throttle()
+        if attempt >= self.LLM_MAX_RETRIES or not _is_retryable(error):
+            return None
+        delay = backoff_delay(attempt, self.LLM_BACKOFF_BASE, self.LLM_BACKOFF_CAP)
+        logger.warning(f"Gemini call failed ({error}), retry {attempt + 1} in {delay:.2f}s")
+        return delay
+
+    def _generate(self, prompt, response_schema=None, call_site=None):
+        for attempt in range(self.LLM_MAX_RETRIES + 1):
+            self._acquire_llm_slot()
+            try:
+                gemini_rate_limiter.acquire()
+                response = self.backend.generate(
+                    prompt, call_site=call_site, response_schema=response_schema, timeout=self.LLM_TIMEOUT
+                )
+                gemini_rate_limiter.on_success()
+                gemini_concurrency_limiter.on_success()
+                return response.strip()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                gemini_concurrency_limiter.release()
+            time.sleep(delay)
+
+    def _stream_llm(self, prompt, call_site: str = None):
+        """
+        Yields the response text of a streamed generation chunk by chunk.
+        Streams are neither cached nor coalesced, and are only retried before the first chunk.
+        """
+        self.prompt_builder.record(call_site, prompt)
+        for attempt in range(self.LLM_MAX_RETRIES + 1):
+            self._acquire_llm_slot()
+            started = False
+            try:
+                gemini_rate_limiter.acquire()
+                for text in self.backend.stream(prompt, call_site=call_site, timeout=self.LLM_TIMEOUT):
+                    started = True
+                    yield text
+                gemini_rate_limiter.on_success()
+                gemini_concurrency_limiter.on_success()
+                return
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None or started:
+                    raise
+            finally:
+                gemini_concurrency_limiter.release()
+            time.sleep(delay)
+
+    def get_metrics(self):
+        return {
+            "llm_backend": self.backend.model_id,
+            "single_flight": self.single_flight.stats(),
+            "response_cache": self.response_cache.stats(),
+            "gemini_rate_limiter": gemini_rate_limiter.stats(),
+            "gemini_concurrency_limiter": gemini_concurrency_limiter.stats(),
+            "search_rate_limiter": search_rate_limiter.stats(),
+            "scrape_cache": self.scrape_cache.stats(),
+            "profile_results_cache": self.profile_results_cache.stats(),
+            "query_classifier": self.query_classifier.stats(),
+            "prompt_sizes": self.prompt_builder.stats(),
+        }
+
+    def _memoize_for_profile(self, kind: str, email: str, generate):
+        """
+        Returns generate(email), reusing the previous result while the user's profile version is unchanged.
+
+        Args:
+            kind (str): name of the generated result, part of the cache key
+            email (str): user email
+            generate (callable): uncached generator taking the email
 
+        Returns:
+            list: the generated result (a copy, callers may mutate it)
+        """
+        version = self.profile_store.get_snapshot(email, self.SAVED_PLACES_LIMIT)["version"]
+        key = (kind, email, version)
+        entry = self.profile_results_cache.get(key)
+        if entry is not None:
+            result, generated_at = entry
+            if self.BACKGROUND_REFRESH and time.time() - generated_at > self.PROFILE_RESULTS_REFRESH_AFTER:
+                self._refresh_in_background(key, email, generate)
+            return list(result)
+
+        result = generate(email)
+        # Empty results are usually a bad LLM response, don't pin them for a day
+        if result:
+            self.profile_results_cache.set(key, (result, time.time()))
+        return list(result)
+
+    def _refresh_in_background(self, key, email, generate):
+        with self._refreshing_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                with self.background_priority():
+                    result = generate(email)
+                if result:
+                    self.profile_results_cache.set(key, (result, time.time()))
+            except Exception as e:
+                logger.warning(f"Background refresh of {key[0]} for {email} failed: {e}")
+            finally:
+                with self._refreshing_lock:
+                    self._refreshing.discard(key)
+
+        self._refresh_executor.submit(refresh)
+
+    def _get_relevant_user_info(self, email: str, limit: int, include_description: bool):
+        """
+        Returns:
+            dict: the user's prompt sections, compacted and trimmed to their token budgets
+        """
+        snapshot = self.profile_store.get_snapshot(email, limit)
+        sections = {
+            "visited_places": json.loads(snapshot["visited_places"]),
+            "interests": json.loads(snapshot["interests"]),
+        }
         if include_description:
-            relevant_info["userDescription"] = user_data.get("userDescription", "")
-            relevant_info["geminiDescription"] = user_data.get("geminiDescription", "")
+            sections["userDescription"] = snapshot["userDescription"] or ""
+            sections["geminiDescription"] = snapshot["geminiDescription"] or ""
 
-        return relevant_info
+        return self.prompt_builder.render(**sections)
 
     def _construct_relevant_fields_from_places_data(self, places_data: list):
         return [
@@ -125,7 +370,7 @@ class LLMTools:
                 "reviews": [
                     {
                         "rating": review.get("rating"),
-                        "text": review.get("text")
+                        "text": truncate_words(review.get("text") or "", self.REVIEW_MAX_WORDS)
                     } for review in place.get("reviews", [])
                 ],
                 "primary_type": place.get("primaryType", ""),
@@ -145,7 +390,7 @@ class LLMTools:
             "user_rating_count": place_data.get("userRatingCount"),
             "reviews": [
                 {
-                    "text": review.get("text", ""),
+                    "text": truncate_words(review.get("text") or "", self.REVIEW_MAX_WORDS),
                     "rating": review.get("rating")
                 } for review in place_data.get("reviews", [])
             ][:5],
@@ -155,13 +400,33 @@ class LLMTools:
 
 
     def generate_user_description(self, email: str):
+        prompt = self._build_user_description_prompt(email)
+        if prompt is None:
+            return self.NOT_ENOUGH_USER_INFO_MESSAGE
+        return self._call_llm(prompt, call_site="user_description")
+
+    def stream_user_description(self, email: str):
+        """
+        Streaming variant of generate_user_description, yields the text as Gemini generates it.
+        """
+        prompt = self._build_user_description_prompt(email)
+        if prompt is None:
+            yield self.NOT_ENOUGH_USER_INFO_MESSAGE
+            return
+        yield from self._stream_llm(prompt, call_site="user_description")
+
+    def _build_user_description_prompt(self, email: str):
+        """
+        Returns:
+            str or None: the prompt, or None when there is not enough user data to describe
+        """
         # Visited places data
         user_info = self._get_relevant_user_info(email=email, limit=self.SAVED_PLACES_LIMIT, include_description=False)
         user_visited_places = user_info.get("visited_places", "{}")
         user_interests = user_info.get("interests", "{}")
         user_description = user_info.get("userDescription", "")
         if len(json.loads(user_interests).get("interests", [])) == 0 and len(json.loads(user_visited_places).get("visited_places", [])) == 0 and not user_description:
-            return "Hi, there is not enough information about you. Please add a brief description about your preferences below!"
+            return None
 
         PROMPT = f"""
         You are an AI assistant for the places recommendation app. This app gives the user some place recommendations based on the user's preference.
@@ -189,9 +454,12 @@ class LLMTools:
         Now, combining the visited places and interests, generate a short story or description about the user. The answer must only be the short story or description about the user, don't give explanation or other thing. Despite the lack of user data and you can't think of any personalized description for the user, you still have to give generic description that applies to most users.
         """
         
-        return self._call_llm(PROMPT)
+        return PROMPT
 
     def generate_place_types(self, email: str) -> list:
+        return self._memoize_for_profile("place_types", email, self._generate_place_types)
+
+    def _generate_place_types(self, email: str) -> list:
         user_info = self._get_relevant_user_info(email=email, limit=self.SAVED_PLACES_LIMIT, include_description=True)
 
         # Prepare the prompt
@@ -206,31 +474,33 @@ class LLMTools:
         The following are some places the user has visited:
         {user_info["visited_places"]}
         
-        Based on the user's description, gemini description, interests, and visited places, identify the most relevant types of places for this user from the following list:
-        {', '.join(self.POSSIBLE_PLACE_TYPES)}
+        Based on the user's description, gemini description, interests, and visited places, identify the most relevant Google Maps place types for this user. The allowed types are listed in the response schema.
 
         The maximum place types that you can think of is nine (9) types. So think of the nine most relevant types based on the user data.
 
         Other than that, you can also predict which place types that might be relevant to the user as well. So based on the user's data, try to guess the place types from the list of possible place types which might interests the user.
 
-        Return only the types of places that are most relevant to the user, separated by commas.
+        Return only the types of places that are most relevant to the user, as a JSON array of strings.
         
-        For example: convention_center, department_store, farm, ferry_terminal, food, french_restaurant, gift_shop
+        For example: ["convention_center", "department_store", "farm", "ferry_terminal", "french_restaurant", "gift_shop"]
         
-        Do not provide explanations at all, just the answer seperated by commas.
+        Do not provide explanations at all, just the JSON array.
         """
 
-        # Call the LLM to generate the filtered place types (three tries)
-        for i in range(3):
-            response = self._call_llm(PROMPT)
-            filtered_place_types = [place_type.strip() for place_type in response.split(",") if place_type.strip()]
-            filtered_place_types = [place for place in filtered_place_types if place in self.POSSIBLE_PLACE_TYPES]
-            if len(filtered_place_types) > 0:
-                break
+        # The schema restricts the answer to POSSIBLE_PLACE_TYPES, off-format output is repaired locally
+        response_schema = place_types_schema(self.POSSIBLE_PLACE_TYPES)
+        response = self._call_llm(PROMPT, call_site="place_types", response_schema=response_schema)
+        filtered_place_types = parse_place_types(response, self.POSSIBLE_PLACE_TYPES)
+        if not filtered_place_types:
+            logger.warning(f"generate_place_types(): No valid place types in response: {response}")
+            self._forget_llm_response(PROMPT, response_schema)
 
         return filtered_place_types
 
     def generate_text_queries(self, email: str) -> list:
+        return self._memoize_for_profile("text_queries", email, self._generate_text_queries)
+
+    def _generate_text_queries(self, email: str) -> list:
         user_info = self._get_relevant_user_info(email=email, limit=self.SAVED_PLACES_LIMIT, include_description=True)
 
         # Prepare the prompt
@@ -264,14 +534,33 @@ class LLMTools:
         """
 
         # Call the LLM to generate the text queries
-        response = self._call_llm(PROMPT)
+        response = self._call_llm(PROMPT, call_site="text_queries")
         text_queries = [place_type.strip() for place_type in response.split(",") if place_type.strip()]
 
         return text_queries
 
+    def rank_places_locally(self, email: str, places: list, query: str = "", top_k: int = None) -> list:
+        """
+        Orders places for the user without calling the LLM (see place_ranker).
+
+        Args:
+            email (str): user email
+            places (list): constructed place dicts
+            query (str): optional search query the places should match
+            top_k (int): number of places to keep, all if None
+
+        Returns:
+            list: the best places first
+        """
+        keywords = self.profile_store.get_keywords(email, self.SAVED_PLACES_LIMIT, query=query)
+        return rank_places(places, keywords, top_k=top_k)
+
     def filter_relevant_places(self, email: str, places: list, weather: str) -> list:
+        places = self.rank_places_locally(email, places, top_k=self.PRE_RANK_TOP_K)
         user_info = self._get_relevant_user_info(email=email, limit=self.SAVED_PLACES_LIMIT, include_description=True)
-        places_json = json.dumps(self._construct_relevant_fields_from_places_data(places_data=places))
+        places_json = self.prompt_builder.render(
+            places=self._construct_relevant_fields_from_places_data(places_data=places)
+        )["places"]
         
         PROMPT = f"""
         You are an AI assistant for a places recommendation app. This app gives the user some place recommendations based on the user's preferences.
@@ -296,13 +585,18 @@ class LLMTools:
         Provide only the place IDs of the top 12 places starting from the best one, separated by commas. Do not provide any other explanations or details at all!
         """
 
-        response = self._call_llm(PROMPT)
+        response = self._call_llm(PROMPT, call_site="filter_places")
         filtered_place_ids = [place_id.strip() for place_id in response.strip().split(",") if place_id.strip()]
         filtered_places = [place for place in places if place["place_id"] in filtered_place_ids]
         return filtered_places
 
 
     def parse_query_for_search(self, query: str):
+        # Plain place types and dishes are decided locally, the LLM only sees ambiguous queries
+        fast_path = self.query_classifier.classify(query)
+        if fast_path is not None:
+            return fast_path
+
         PROMPT = f"""
         You are an AI assistant for a places recommendation app. This app gives the user some place recommendations based on the user's query.
 
@@ -314,16 +608,16 @@ class LLMTools:
         
         A Text Search (New) returns information about a set of places based on a string — for example "pizza in New York" or "shoe stores near Ottawa" or "123 Main Street". The service responds with a list of places matching the text string and any location bias that has been set. The service is especially useful for making ambiguous address queries in an automated system, and non-address components of the string may match businesses as well as addresses. Examples of ambiguous address queries are poorly-formatted addresses or requests that include non-address components such as business names. Requests like the first two examples in the following table may return zero results unless a location — such as region, location restriction, or location bias — is set.
 
-        Respond with a python dictionary object that includes:
+        Respond with a JSON object that includes:
         - "use_text_search": true or false
         - "text_query": the query to be used for the text search (if applicable)
         - "types": a list of place types to be used for the nearby search (if applicable)
 
         The text_query field might not be clear from the user's query. So you have to think about what the user really wants from the user's query and what should you type on the text_query so that the google text search API can work.
 
-        If the nearby search API is more appropriate (since we can specify types), the "types" variables need to be taken from the following list: [{', '.join(self.POSSIBLE_PLACE_TYPES)}]
+        If the nearby search API is more appropriate (since we can specify types), the "types" variables need to be Google Maps place types from the list in the response schema.
 
-        Note that for the use_text_search equals false, the types needs to be contains in the list above, do not use types other than the one listed above.
+        Note that for the use_text_search equals false, the types need to be in that list, do not use any other types.
 
         Example 1:
         If the user's query is: "I'm hungry, I want to eat mexican food near me, possibly with chicken.
@@ -349,7 +643,7 @@ class LLMTools:
         You can answer:
         {{
             "use_text_search": false,
-            "types": ["hiking_area", "national_park"
+            "types": ["hiking_area", "national_park"]
         }}
         
         or you can answer:
@@ -388,23 +682,23 @@ class LLMTools:
         Respond only the dictionary object (i.e. {{...}}) without any other explanations or symbol starting and ending with curly braces.
         """
 
-        response = self._call_llm(PROMPT)
-        try:
-            response = response.strip()
-            response_dict = json.loads(response)
-            if not response_dict.get("use_text_search"):
-                filtered_place_types = [place for place in response_dict.get("types", []) if place in self.POSSIBLE_PLACE_TYPES]
-                response_dict["types"] = list(set(filtered_place_types))
-            return response_dict
-        except json.JSONDecodeError as e:
-            print(f"JSON decode error: {e}")
-            print("Response text that caused the error:", response)
-            return None
+        response_schema = query_parse_schema(self.POSSIBLE_PLACE_TYPES)
+        response = self._call_llm(PROMPT, call_site="parse_query", response_schema=response_schema)
+        response_dict = parse_query_parse(response, query, self.POSSIBLE_PLACE_TYPES)
+        if response_dict is None:
+            # Unusable output falls back to a text search for the raw query, and is not kept in the cache
+            logger.info(f"parse_query_for_search(): Falling back to text search, response: {response}")
+            self._forget_llm_response(PROMPT, response_schema)
+            return {"use_text_search": True, "text_query": query}
+        return response_dict
 
 
     def filter_relevant_places_based_on_query(self, query: str, email: str, places: list, weather: str) -> list:
+        places = self.rank_places_locally(email, places, query=query, top_k=self.PRE_RANK_TOP_K)
         user_info = self._get_relevant_user_info(email=email, limit=self.SAVED_PLACES_LIMIT, include_description=True)
-        places_json = json.dumps(self._construct_relevant_fields_from_places_data(places_data=places))
+        places_json = self.prompt_builder.render(
+            places=self._construct_relevant_fields_from_places_data(places_data=places)
+        )["places"]
 
         PROMPT = f"""
         You are an AI assistant for a places recommendation app. This app gives the user some place recommendations based on the user's preferences and specific query.
@@ -432,26 +726,56 @@ class LLMTools:
         Provide only the place IDs of the top 12 places starting from the best one, separated by commas. Do not provide any other explanations or details at all!
         """
 
-        response = self._call_llm(PROMPT)
+        response = self._call_llm(PROMPT, call_site="filter_places")
         filtered_place_ids = [place_id.strip() for place_id in response.strip().split(",") if place_id.strip()]
         filtered_places = [place for place in places if place["place_id"] in filtered_place_ids]
         return filtered_places
     
+    def _create_scrape_session(self):
+        adapter = HTTPAdapter(pool_connections=self.SCRAPE_WORKERS, pool_maxsize=self.SCRAPE_WORKERS)
+        session = requests.Session()
+        session.headers.update(self.SCRAPE_HEADERS)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
     def _scrape_website(self, url):
+        """
+        Returns the cleaned text of a page, from the scrape cache when possible.
+        Stale cache entries are revalidated with If-None-Match / If-Modified-Since.
+        """
         try:
-            def custom_extractor(html_content):
-                soup = BeautifulSoup(html_content, "html.parser")
-                return soup.get_text()
-
-            loader = WebBaseLoader(url)
-            docs = loader.load()
-            website_content = ' '.join([doc.page_content for doc in docs])
+            cached = self.scrape_cache.get(url)
+            if cached and cached["fresh"]:
+                self.scrape_cache.record("hit")
+                return cached["content"]
+
+            headers = {}
+            if cached and cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached and cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+            response, page_text = fetch_page_text(
+                self.scrape_session, url, headers=headers, timeout=self.SCRAPE_TIMEOUT, max_words=self.MAX_SCRAPED_WORDS
+            )
+            if cached and response.status_code == 304:
+                self.scrape_cache.mark_revalidated(url)
+                self.scrape_cache.record("revalidated")
+                return cached["content"]
+
+            website_content = " ".join(clean_text(page_text).split()[:self.MAX_SCRAPED_WORDS])
+            self.scrape_cache.put(
+                url, website_content, response.headers.get("ETag"), response.headers.get("Last-Modified")
+            )
+            self.scrape_cache.record("miss")
             return website_content
         except Exception as e:
             print(f"Error scraping website: {e}")
             return ""
 
     def _run_google_search(self, query, num_results=5):
+        if self.backend.offline:
+            return []
         search = GoogleSearchAPIWrapper()
         def topn_results(query):
             return search.results(query, num_results)
@@ -461,16 +785,64 @@ class LLMTools:
             description="Search Google for recent results.",
             func=topn_results,
         )
-        return tool.run(query)
+        return _call_rate_limited(search_rate_limiter, tool.run, query)
+
+    def _scrape_websites(self, urls: list, deadline: float) -> dict:
+        """
+        Scrapes the URLs concurrently, giving up on pages not done by the deadline.
+
+        Args:
+            urls (list): URLs to scrape
+            deadline (float): time.monotonic() value after which pending scrapes are dropped
+
+        Returns:
+            dict: URL to scraped content, "" for pages that failed or missed the deadline
+        """
+        futures = {self._scrape_executor.submit(self._scrape_website, url): url for url in dict.fromkeys(urls)}
+        done, not_done = wait(futures, timeout=max(deadline - time.monotonic(), 0))
+        for future in not_done:
+            future.cancel()
+            logger.info(f"Scraping {futures[future]} missed the deadline")
+        contents = {url: "" for url in urls}
+        contents.update({futures[future]: future.result() for future in done})
+        return contents
+
+    def process_place_details(self, email: str, place_data: dict, progress=None) -> dict:
+        """
+        Adds personalized "interesting_facts" to the place data.
+
+        Args:
+            email (str): user email
+            place_data (dict): place details from Maps, updated in place
+            progress (callable): optional callback receiving a short description of each step
+
+        Returns:
+            dict: the place data
+        """
+        interesting_facts = self._call_llm(
+            self._build_interesting_facts_prompt(email, place_data, progress), call_site="interesting_facts"
+        )
+        logger.info(f"process_place_details(): Interesting facts: {interesting_facts}")
+        place_data["interesting_facts"] = interesting_facts
+        return place_data
 
-    def process_place_details(self, email: str, place_data: dict) -> dict:
+    def stream_interesting_facts(self, email: str, place_data: dict):
+        """
+        Streaming variant of process_place_details: runs the same research steps, then
+        yields the interesting facts text as Gemini generates it.
+        """
+        yield from self._stream_llm(
+            self._build_interesting_facts_prompt(email, place_data), call_site="interesting_facts"
+        )
+
+    def _build_interesting_facts_prompt(self, email: str, place_data: dict, progress=None) -> str:
         def _get_prompt_for_content_check(additional_info: list): 
             return f"""
             You are an AI assistant for a places recommendation app. This app gives the user some place recommendations based on the user's preferences and specific query.
             
             Please check the following scraped website content from different sources to determine if this information is sufficient to provide interesting facts about the {relevant_place_data["title"]} for the user. 
 
-            Website Content: {json.dumps(additional_info)}.
+            Website Content: {render_additional_info(additional_info)}.
 
             Response with either YES or NO only.
 
@@ -484,9 +856,9 @@ class LLMTools:
 
             You are now planning to write about the personalized interesting fact (or information if applicable) about {relevant_place_data["title"]} for the user. You have gained access about the user's preference and user's historical visited place.
 
-            Here is the information that is available about the place: {json.dumps(relevant_place_data)}
-            Here is the information that has been scraped from the website or google: {json.dumps(additional_info)}
-            The queries that have been used to generate the above results (empty if we haven't use Google Search): {json.dumps(tried_queries)}
+            Here is the information that is available about the place: {place_json}
+            Here is the information that has been scraped from the website or google: {render_additional_info(additional_info)}
+            The queries that have been used to generate the above results (empty if we haven't use Google Search): {compact_json(tried_queries)}
 
             The available content is still not sufficient to generate interesting facts (or information if this place needs information) about {relevant_place_data['title']}. 
 
@@ -508,81 +880,102 @@ class LLMTools:
             You have to focus on the user data since the interesting fact needs to be according to the user. Make it personalized.
             
             Here are the details about the place:
-            {json.dumps(relevant_place_data)}
+            {place_json}
             
             Here are the additional informations that are scraped from the internet about the place:
-            {json.dumps(additional_info)}
+            {render_additional_info(additional_info)}
             
             Now generate the interesting facts about the place. The interesting facts need to be very personalized to the user so different user needs to have different interesting facts about the place.
             
             Generate one paragraph interesting facts only without any other explanation! The interesting facts need to be very personalized to show why the user will like the place! Be creative!
             """
+        def render_additional_info(additional_info):
+            return self.prompt_builder.render(additional_info=additional_info)["additional_info"]
+
+        def _fit_scraped_content_to_budget():
+            # Keep only the chunks most relevant to the place and the user's interests
+            selected = select_relevant_chunks(scraped_documents, relevance_query, self.SCRAPED_CONTEXT_WORDS)
+            filled = set()
+            for item in additional_info:
+                if item.get("link") in selected and item["link"] not in filled:
+                    item["content"] = selected[item["link"]]
+                    filled.add(item["link"])
+
+        def _report(message):
+            if progress:
+                progress(message)
+
         scrapped_urls = []
+        scraped_documents = {}
+        deadline = time.monotonic() + self.PLACE_DETAILS_DEADLINE
         logger.info("process_place_details() triggered")
         logger.info("process_place_details(): Fetching relevant user info...")
+        _report("Reading your profile")
         user_info = self._get_relevant_user_info(email=email, limit=self.SAVED_PLACES_LIMIT, include_description=True)
         logger.info(f"process_place_details(): User info fetched: {user_info}")
         logger.info("Constructing relevant fields from place details data...")
         relevant_place_data = self._construct_relevant_fields_from_place_details_data(place_data=place_data)
         logger.info(f"process_place_details(): Relevant place data: {relevant_place_data}")
+        place_json = self.prompt_builder.render(place=relevant_place_data)["place"]
+        relevance_query = " ".join([relevant_place_data["title"]] * 2 + [user_info["interests"]])
         additional_info = []
         if "website_uri" in relevant_place_data and relevant_place_data.get("website_uri"):
             logger.info(f"process_place_details(): Scraping website content from {relevant_place_data.get('website_uri')}...")
+            website_uri = relevant_place_data["website_uri"]
+            _report("Reading the place's website")
+            scraped_documents[website_uri] = self._scrape_websites([website_uri], deadline)[website_uri]
             additional_info = [
                 {
-                    "link": relevant_place_data.get("website_uri"),
+                    "link": website_uri,
                     "title": "",
                     "snippet": "",
-                    "content": self._scrape_website(relevant_place_data["website_uri"])
+                    "content": ""
                 }
             ]
-            scrapped_urls.append(relevant_place_data.get("website_uri"))
+            scrapped_urls.append(website_uri)
+            _fit_scraped_content_to_budget()
             logger.info("process_place_details(): Website content scraped.")
         prompt_for_content_check = _get_prompt_for_content_check(additional_info=additional_info)
-        content_check_response = self._call_llm(prompt_for_content_check)
+        content_check_response = self._call_llm(prompt_for_content_check, call_site="content_check")
         logger.info(f"process_place_details(): Content check response: {content_check_response}")
-        time.sleep(0.8)
 
         AGENT_ITERATION_LIMIT = 3
         i = 0
         tried_queries = []
-        while content_check_response.lower() != 'yes' and i < AGENT_ITERATION_LIMIT:
+        while content_check_response.lower() != 'yes' and i < AGENT_ITERATION_LIMIT and time.monotonic() < deadline:
             i += 1
-            google_query_prompt = _get_prompt_for_query(additional_info=additional_info, relevant_place_data=relevant_place_data, tried_queries=tried_queries)
             if i == 1:
                 query_string = relevant_place_data["title"]
             else:
-                query_string = self._call_llm(google_query_prompt)
+                google_query_prompt = _get_prompt_for_query(additional_info=additional_info, relevant_place_data=relevant_place_data, tried_queries=tried_queries)
+                query_string = self._call_llm(google_query_prompt, call_site="search_query")
             tried_queries.append(query_string)
+            _report(f"Searching the web ({i}/{AGENT_ITERATION_LIMIT})")
             logger.info(f"process_place_details(): Query string for Google search: {query_string}")
-            time.sleep(0.8)
             search_results = self._run_google_search(query_string)
             logger.info(f"process_place_details(): Search results: {search_results}")
 
             # No good Google Search Result was found
-            if len(search_results) == 1:
+            if len(search_results) <= 1:
                 break
             
-            # Scrape content of each result
+            # Scrape content of all results at once
+            scraped_contents = self._scrape_websites(
+                [result["link"] for result in search_results if result["link"] not in scrapped_urls], deadline
+            )
             for result in search_results:
                 if result["link"] in scrapped_urls:
                     continue
-                logger.info(f"process_place_details(): Scraping content from {result['link']}...")
-                cleaned_content = clean_text(self._scrape_website(url=result["link"]))
-                
-                # TODO: Might need to use vector database rather than heuristic first 500 tokens (firestore can do vector store??)
-                result["content"] = " ".join(cleaned_content.split()[:500])
-                logger.info(f"process_place_details(): Scraped content: {result['content']}")
+                scraped_documents[result["link"]] = clean_text(scraped_contents[result["link"]])
+                result["content"] = ""
             additional_info += search_results
+            _fit_scraped_content_to_budget()
+            logger.info(f"process_place_details(): Selected scraped content: {[item.get('content') for item in additional_info]}")
             prompt_for_content_check = _get_prompt_for_content_check(additional_info=additional_info)
-            content_check_response = self._call_llm(prompt_for_content_check)
+            content_check_response = self._call_llm(prompt_for_content_check, call_site="content_check")
             logger.info(f"process_place_details(): Updated content check response: {content_check_response}")
-            time.sleep(0.8)
+        _report("Writing interesting facts")
 
-        interesing_facts_prompt = _get_prompt_for_interesting_facts(
+        return _get_prompt_for_interesting_facts(
             additional_info=additional_info, relevant_place_data=relevant_place_data, user_info=user_info
-        )
-        interesting_facts = self._call_llm(interesing_facts_prompt)
-        logger.info(f"process_place_details(): Interesting facts: {interesting_facts}")
-        place_data["interesting_facts"] = interesting_facts
-        return place_data
\ No newline at end of file
+        )
\ No newline at end of file
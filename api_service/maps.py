@@ -1,110 +1,298 @@
 import os
 import json
 import math
-import time
 import requests
-from bs4 import BeautifulSoup
+import numpy as np
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from itertools import repeat
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from rate_limiter import TokenBucket
+from cache import TTLCache
+from single_flight import SingleFlight
+from spatial_index import get_place_index
+from place_urls import place_id_from_url, place_name_from_url, place_name_from_head
+from geo import parse_location, encode_geohash, radius_bucket, haversine_distances, argsort_by_distance, top_k_by_distance
 
 import logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# Places field-mask profiles, lightest first. Each request should use the lightest
+# profile that has every field it needs; heavier profiles cost more per request.
+MINIMAL_FIELDS = ["id", "displayName", "location"]
+LIST_FIELDS = MINIMAL_FIELDS + [
+    "formattedAddress",
+    "photos",
+    "rating",
+    "userRatingCount",
+    "primaryType",
+    "types",
+    "currentOpeningHours",
+    "accessibilityOptions",
+]
+RANK_FIELDS = LIST_FIELDS + ["editorialSummary", "reviews", "websiteUri"]
+DETAIL_FIELDS = RANK_FIELDS + [
+    "addressComponents",
+    "plusCode",
+    "priceLevel",
+    "internationalPhoneNumber",
+    "nationalPhoneNumber",
+    "regularOpeningHours",
+]
+FIELD_MASK_PROFILES = {
+    "minimal": MINIMAL_FIELDS,  # ids and coordinates only
+    "list": LIST_FIELDS,  # result cards
+    "rank": RANK_FIELDS,  # reviews and summaries for LLM filtering
+    "detail": DETAIL_FIELDS,  # place details screen
+}
+DEFAULT_SEARCH_PROFILE = "rank"
+
+# Places QPS budget shared by every Maps instance in the process
+PLACES_QPS = 10
+PLACES_BURST = 10
+places_rate_limiter = TokenBucket(rate=PLACES_QPS, capacity=PLACES_BURST)
+
+# Raw Places details payloads keyed by place_id; they do not depend on the user
+PLACE_DETAILS_CACHE_SIZE = 2048
+PLACE_DETAILS_CACHE_TTL = 60 * 60
+place_details_cache = TTLCache(maxsize=PLACE_DETAILS_CACHE_SIZE, ttl=PLACE_DETAILS_CACHE_TTL)
+
+# Raw text search results keyed by (query, geohash cell, radius bucket, page size)
+SEARCH_CACHE_SIZE = 4096
+SEARCH_CACHE_TTL = 10 * 60
+SEARCH_CACHE_GEOHASH_PRECISION = 6
+places_search_cache = TTLCache(maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+
+# Takeout saved-place URL -> place_id; persisted by CSVUploader across instances
+PLACE_ID_CACHE_SIZE = 20000
+PLACE_ID_CACHE_TTL = 30 * 24 * 60 * 60
+place_id_cache = TTLCache(maxsize=PLACE_ID_CACHE_SIZE, ttl=PLACE_ID_CACHE_TTL)
+
+# Identical in-flight Places requests share one upstream call
+places_single_flight = SingleFlight()
+
+
 class Maps:
 
-    def __init__(self):
+    PLACES_TEXT_SEARCH_URL = "https://places.googleapis.com/v1/places:searchText"
+    PLACES_NEARBY_SEARCH_URL = "https://places.googleapis.com/v1/places:searchNearby"
+    PLACES_DETAILS_URL = "https://places.googleapis.com/v1/places/{place_id}"
+    PLACES_QUERY_AUTOCOMPLETE_URL = "https://maps.googleapis.com/maps/api/place/queryautocomplete/json"
+    # Legacy Places API, behind the original /nearby-attractions and /nearby-restaurants
+    LEGACY_NEARBY_SEARCH_URL = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+
+    # HTTP connection pool / retry defaults for the Places endpoints
+    POOL_CONNECTIONS = 10
+    POOL_MAXSIZE = 20
+    CONNECT_TIMEOUT = 3.05
+    READ_TIMEOUT = 10
+    MAX_RETRIES = 3
+    BACKOFF_FACTOR = 0.5
+    RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+    LEGACY_ATTRACTION_TYPES = "park|restaurant|museum|tourist_attraction"
+    LEGACY_RESTAURANT_TYPES = "restaurant|cafe|bar|dessert"
+    # Places API (New) has no "dessert" type, bakery and ice_cream_shop stand in for it
+    ATTRACTION_TYPES = ["park", "restaurant", "museum", "tourist_attraction"]
+    RESTAURANT_TYPES = ["restaurant", "cafe", "bar", "bakery", "ice_cream_shop"]
+    # Places searchNearby limits
+    NEARBY_MAX_RADIUS = 50000
+    NEARBY_MAX_RESULTS = 20
+    PHOTO_URL_PREFIX = "https://places.googleapis.com/v1/"
+    # Only the document head is read when a saved-place page must be fetched
+    HTML_HEAD_MAX_BYTES = 64 * 1024
+
+    def __init__(
+        self,
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT,
+        max_retries=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        rate_limiter=None,
+        details_cache=None,
+        search_cache=None,
+        search_cache_precision=SEARCH_CACHE_GEOHASH_PRECISION,
+        place_index=None,
+    ):
         with open(os.getenv("GOOGLE_KEY")) as f:
             self.MAPS_API_KEY = json.load(f)["GOOGLE_API_KEY"]
+        self.rate_limiter = rate_limiter or places_rate_limiter
+        self.details_cache = details_cache if details_cache is not None else place_details_cache
+        self.search_cache = search_cache if search_cache is not None else places_search_cache
+        self.search_cache_precision = search_cache_precision
+        self.place_index = place_index or get_place_index()
+        self.place_id_cache = place_id_cache
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = self._create_session(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=max_retries,
+            backoff_factor=backoff_factor,
+        )
+        self.single_flight = places_single_flight
+        self.executor = ThreadPoolExecutor(max_workers=self.get_max_threads())
+
+    def get_metrics(self):
+        return {
+            "place_details_cache": self.details_cache.stats(),
+            "search_cache": self.search_cache.stats(),
+            "single_flight": self.single_flight.stats(),
+            "place_index": self.place_index.stats(),
+            "place_id_cache": self.place_id_cache.stats(),
+        }
 
-    def get_nearby_attractions(self, location, radius=5000):
-        types = "park|restaurant|museum|tourist_attraction"  
-        url = f"https://maps.googleapis.com/maps/api/place/nearbysearch/json?location={location}&radius={radius}&type={types}&key={self.MAPS_API_KEY}"
+    def get_place_id_offline(self, url):
+        """
+        Resolves a saved-place URL without network calls: first from the URL cache,
+        then from a place ID or feature ID encoded in the URL itself.
+        """
+        place_id = self.place_id_cache.get(url)
+        if place_id is None:
+            place_id = place_id_from_url(url)
+            if place_id:
+                self.place_id_cache.set(url, place_id)
+        return place_id
+
+    def _autocomplete_params(self, place_name):
+        return {
+            "input": place_name,
+            "types": "geocode",
+            "key": self.MAPS_API_KEY,
+        }
 
-        response = requests.get(url)
-        return response
+    def _nearby_scope(self, types, profile):
+        return f"searchNearby:{profile}:" + "|".join(sorted(set(types)))
+
+    def _lookup_nearby_in_index(self, types, location, radius, profile):
+        """
+        Answers a typed nearby search from the local place index when every cell it
+        touches was searched recently; returns None for cold areas.
+        """
+        latitude, longitude = parse_location(location)
+        radius = min(float(radius), self.NEARBY_MAX_RADIUS)
+        records = self.place_index.lookup(
+            self._nearby_scope(types, profile), latitude, longitude, radius, types=types, limit=self.NEARBY_MAX_RESULTS
+        )
+        if records is None:
+            return None
+        places = [self._from_index_record(record) for record in records]
+        if places:
+            distances = self._calculate_distances(location, [place["location"] for place in places])
+            for place, distance in zip(places, distances):
+                place["distance"] = distance
+        return places
+
+    def _index_nearby_results(self, types, location, radius, places, profile):
+        latitude, longitude = parse_location(location)
+        radius = min(float(radius), self.NEARBY_MAX_RADIUS)
+        self._add_to_index(places)
+        self.place_index.mark_covered(
+            self._nearby_scope(types, profile), latitude, longitude, radius,
+            result_count=len(places), max_results=self.NEARBY_MAX_RESULTS,
+        )
+
+    def _add_to_index(self, places):
+        self.place_index.add_places([self._to_index_record(place) for place in places])
+
+    def _to_index_record(self, place):
+        # Photo URLs embed the API key, so the index stores the photo names instead
+        record = {key: value for key, value in place.items() if key != "photo_url"}
+        record["photo_names"] = [self._photo_name(url) for url in place.get("photo_url", []) if url]
+        return record
+
+    def _from_index_record(self, record):
+        place = {key: value for key, value in record.items() if key != "photo_names"}
+        place["photo_url"] = [self._get_photo_url(name) for name in record.get("photo_names", [])]
+        return place
+
+    def _single_flight_key(self, method, url, kwargs):
+        """
+        Identifies a request by method, URL, query params, body and field mask.
+        """
+        headers = kwargs.get("headers") or {}
+        params = kwargs.get("params") or {}
+        return (
+            method,
+            url,
+            json.dumps(params, sort_keys=True, default=str),
+            kwargs.get("data") or kwargs.get("content"),
+            headers.get("X-Goog-FieldMask"),
+        )
+
+    def _search_cache_key(self, kind, query, location, radius, page_size, profile=DEFAULT_SEARCH_PROFILE):
+        """
+        Quantizes a search so users a few meters apart sending the same query share
+        one cache entry. Only the raw places are cached; distance is recomputed from
+        the caller's exact location.
+        """
+        latitude, longitude = parse_location(location)
+        return (
+            kind,
+            " ".join(query.lower().split()),
+            encode_geohash(latitude, longitude, self.search_cache_precision),
+            radius_bucket(radius),
+            page_size,
+            profile,
+        )
+
+    def _calculate_distances(self, origin, locations):
+        """
+        Distances in miles from origin ("lat,lng") to each {"latitude", "longitude"} location,
+        computed in one vectorized pass. Unknown coordinates give None.
+        """
+        origin_lat, origin_lng = parse_location(origin)
+        distances = haversine_distances(
+            origin_lat, origin_lng,
+            [location.get("latitude") for location in locations],
+            [location.get("longitude") for location in locations],
+        )
+        return [None if math.isnan(distance) else float(distance) for distance in distances]
+
+    def sort_by_distance(self, places, top_k=None):
+        """
+        Sorts constructed places by their "distance" field, optionally keeping only the
+        nearest top_k. Places without a distance go last.
+        """
+        distances = np.array([place.get("distance") for place in places], dtype=float)
+        if top_k is None:
+            order = argsort_by_distance(distances)
+        else:
+            order = top_k_by_distance(distances, top_k)
+        return [places[i] for i in order]
 
-    def get_nearby_restaurants(self, location, radius=5000):
-        types = "restaurant|cafe|bar|dessert"
-        url = f"https://maps.googleapis.com/maps/api/place/nearbysearch/json?location={location}&radius={radius}&type={types}&key={self.MAPS_API_KEY}"
-
-        response = requests.get(url)
-        return response
-
-    def _calculate_distance(self, lat1, lon1, lat2, lon2):
-        R = 3959
-        dlat = math.radians(lat2 - lat1)
-        dlon = math.radians(lon2 - lon1)
-        a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-        distance = R * c
-        return round(distance, 2)
-
-    def _construct_map_details_headers(self):
+    def _field_mask(self, profile, prefix=""):
+        if profile not in FIELD_MASK_PROFILES:
+            raise ValueError(f"Unknown field mask profile: {profile}")
+        return ",".join(prefix + field for field in FIELD_MASK_PROFILES[profile])
+
+    def _construct_map_details_headers(self, profile="detail"):
         return {
             'Content-Type': 'application/json',
             'X-Goog-Api-Key': self.MAPS_API_KEY,
-            'X-Goog-FieldMask': ",".join(
-                [
-                    'id',
-                    'displayName',
-                    'location',
-                    'currentOpeningHours',
-                    'formattedAddress',
-                    'photos',
-                    'reviews',
-                    'userRatingCount',
-                    'rating',
-                    'editorialSummary',
-                    'primaryType',
-                    'types',
-                    'websiteUri',
-                    'addressComponents',
-                    'plusCode',
-                    'priceLevel',
-                    'internationalPhoneNumber',
-                    'nationalPhoneNumber',
-                    'regularOpeningHours',
-                    'websiteUri',
-                    'accessibilityOptions'
-                ]
-            )
+            'X-Goog-FieldMask': self._field_mask(profile)
         }
 
-    def _construct_map_headers(self):
+    def _construct_map_headers(self, profile=DEFAULT_SEARCH_PROFILE):
         return {
             'Content-Type': 'application/json',
             'X-Goog-Api-Key': self.MAPS_API_KEY,
-            'X-Goog-FieldMask': ",".join(
-                [
-                    'places.id',
-                    'places.displayName',
-                    'places.location',
-                    'places.currentOpeningHours',
-                    'places.formattedAddress',
-                    'places.photos',
-                    'places.reviews',
-                    'places.userRatingCount,',
-                    'places.rating',
-                    'places.editorialSummary',
-                    'places.primaryType',
-                    'places.types',
-                    'places.websiteUri',
-                    'places.accessibilityOptions'
-                ]
-            )
+            'X-Goog-FieldMask': self._field_mask(profile, prefix="places.")
         }
 
     def _construct_map_nearby_search_payload(self, types, location, radius):
         return {
             "includedTypes": types,
-            "maxResultCount": 20,
+            "maxResultCount": self.NEARBY_MAX_RESULTS,
             "locationRestriction": {
                 "circle": {
                     "center": {
                         "latitude": location.split(",")[0].strip(),
                         "longitude": location.split(",")[1].strip()
                     },
-                    "radius": radius
+                    "radius": min(float(radius), self.NEARBY_MAX_RADIUS)
                 }
             },
             "rankPreference": "POPULARITY"
@@ -129,9 +317,13 @@ class Maps:
 
     def _get_photo_url(self, photo_reference, max_width=400, max_height=400):
         if photo_reference:
-            return f"https://places.googleapis.com/v1/{photo_reference}/media?key={self.MAPS_API_KEY}&maxWidthPx={max_width}&maxHeightPx={max_height}"
+            return f"{self.PHOTO_URL_PREFIX}{photo_reference}/media?key={self.MAPS_API_KEY}&maxWidthPx={max_width}&maxHeightPx={max_height}"
         return None
 
+    def _photo_name(self, photo_url):
+        """Inverse of _get_photo_url: the photo resource name, without the API key."""
+        return photo_url[len(self.PHOTO_URL_PREFIX):].split("/media?", 1)[0]
+
     def _get_reviews(self, reviews, top_n=3):
         sorted_reviews = sorted(reviews, key=lambda x: x.get('rating', 0), reverse=True)[:top_n]
         
@@ -177,17 +369,16 @@ class Maps:
                 "primaryType": place.get("primaryType"),
                 "types": place.get("types", []),
                 "currentOpeningHours": place.get("currentOpeningHours", {}).get("weekdayDescriptions", []),
+                "open_now": place.get("currentOpeningHours", {}).get("openNow"),
                 "wheelchairAccessible": any(list(place.get("accessibilityOptions", {}).values())),
             }
-            if origin:
-                origin_lat, origin_lng = map(float, origin.split(','))
-                place_info["distance"] = self._calculate_distance(
-                    origin_lat, origin_lng,
-                    place.get("location", {}).get("latitude"),
-                    place.get("location", {}).get("longitude")
-                )
             constructed_data.append(place_info)
 
+        if origin and constructed_data:
+            distances = self._calculate_distances(origin, [place_info["location"] for place_info in constructed_data])
+            for place_info, distance in zip(constructed_data, distances):
+                place_info["distance"] = distance
+
         return constructed_data
 
     def _construct_place_details_data(self, place, origin=None):
@@ -221,14 +412,109 @@ class Maps:
             "website_uri": place.get("websiteUri")
         }
         if origin:
-            origin_lat, origin_lng = map(float, origin.split(','))
-            place_info["distance"] = self._calculate_distance(
-                origin_lat, origin_lng,
-                place.get("location", {}).get("latitude"),
-                place.get("location", {}).get("longitude")
-            )
+            place_info["distance"] = self._calculate_distances(origin, [place_info["location"]])[0]
         return place_info
 
+    def get_max_threads(self):
+        return int(os.cpu_count() * 1.5)
+
+    def _distribute_searches(self, total, num_queries):
+        base_value = total // num_queries
+        remainder = total % num_queries
+        result = [base_value] * num_queries
+        for i in range(remainder):
+            result[i] += 1
+        return result
+
+    def _create_session(self, pool_connections, pool_maxsize, max_retries, backoff_factor):
+        """
+        Creates a keep-alive session shared by every Maps call so the TCP/TLS
+        handshake with the Google APIs is paid once per pooled connection.
+
+        Args:
+            pool_connections (int): number of per-host connection pools to cache
+            pool_maxsize (int): maximum connections kept alive per host
+            max_retries (int): retries on connection errors and 429/5xx responses
+            backoff_factor (float): exponential backoff factor between retries
+
+        Returns:
+            requests.Session: the configured session
+        """
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=self.RETRY_STATUS_CODES,
+            # Places searchText/searchNearby are read-only, so POST is safe to retry
+            allowed_methods=frozenset(["GET", "POST"]),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _request(self, method, url, **kwargs):
+        key = self._single_flight_key(method, url, kwargs)
+        return self.single_flight.do(key, self._send, method, url, **kwargs)
+
+    def _send(self, method, url, **kwargs):
+        self.rate_limiter.acquire()
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def _legacy_nearby_search(self, location, radius, types):
+        params = {"location": location, "radius": radius, "type": types, "key": self.MAPS_API_KEY}
+        return self._request("GET", self.LEGACY_NEARBY_SEARCH_URL, params=params)
+
+    def get_nearby_attractions(self, location, radius=5000):
+        """
+        Returns:
+            requests.Response: the raw legacy nearbysearch response
+        """
+        return self._legacy_nearby_search(location, radius, self.LEGACY_ATTRACTION_TYPES)
+
+    def get_nearby_restaurants(self, location, radius=5000):
+        """
+        Returns:
+            requests.Response: the raw legacy nearbysearch response
+        """
+        return self._legacy_nearby_search(location, radius, self.LEGACY_RESTAURANT_TYPES)
+
+    def search_nearby_attractions(self, location, radius=5000, profile=DEFAULT_SEARCH_PROFILE):
+        return self.search_nearby_places_by_types(location, radius, self.ATTRACTION_TYPES, profile=profile)
+
+    def search_nearby_restaurants(self, location, radius=5000, profile=DEFAULT_SEARCH_PROFILE):
+        return self.search_nearby_places_by_types(location, radius, self.RESTAURANT_TYPES, profile=profile)
+
+    def search_nearby_places_by_types(self, location, radius=5000, types=None, profile=DEFAULT_SEARCH_PROFILE):
+        """
+        Places API searchNearby restricted to `types`, served from the local place
+        index when the area was searched recently.
+
+        Returns:
+            list or None: constructed places, None if the Places request failed
+        """
+        types = types or self.ATTRACTION_TYPES
+        places = self._lookup_nearby_in_index(types, location, radius, profile)
+        if places is not None:
+            return places
+
+        headers = self._construct_map_headers(profile)
+        payload = self._construct_map_nearby_search_payload(types=types, location=location, radius=radius)
+        response = self._request("POST", self.PLACES_NEARBY_SEARCH_URL, headers=headers, data=json.dumps(payload))
+        if response.status_code != 200:
+            print(f"Error fetching data: {response.status_code}, {response.text}")
+            return None
+        places = self._construct_places_data(response.json().get('places', []), location)
+        self._index_nearby_results(types, location, radius, places, profile)
+        return places
+
     # def get_nearby_places(self, location, radius=5000, types=None):
     #     if types is None:
     #         types = ["tourist_attraction", "museum", "park"]
@@ -259,58 +545,62 @@ class Maps:
     #     combined_results = self._construct_places_data(combined_results, location)
     #     return combined_results
 
-    def get_max_threads(self):
-        return int(os.cpu_count() * 1.5)
+    def _search_nearby_places_mini(self, query, location, radius=5000, num_searches=8, profile=DEFAULT_SEARCH_PROFILE):
+        cache_key = self._search_cache_key("searchText", query, location, radius, num_searches, profile)
+        results = self.search_cache.get(cache_key)
+        if results is not None:
+            return self._construct_places_data(results, location)
 
-    def _search_nearby_places_mini(self, query, location, radius=5000, num_searches=8):
-        headers = self._construct_map_headers()
+        headers = self._construct_map_headers(profile)
         payload = self._construct_map_text_search_payload(query=query, location=location, radius=radius, page_size=num_searches)
-        url = "https://places.googleapis.com/v1/places:searchText"
-        response = requests.post(url, headers=headers, data=json.dumps(payload))
-        if response.status_code == 200:
-            results = response.json().get('places', [])
-        else:
+        response = self._request("POST", self.PLACES_TEXT_SEARCH_URL, headers=headers, data=json.dumps(payload))
+        if response.status_code != 200:
             print(f"Error fetching data: {response.status_code}, {response.text}")
-            results = []
-        return self._construct_places_data(results, location)
-
-    def get_nearby_places(self, location, radius=5000, queries=None):
+            return []
+        results = response.json().get('places', [])
+        self.search_cache.set(cache_key, results)
+        places = self._construct_places_data(results, location)
+        self._add_to_index(places)
+        return places
+
+    def get_nearby_places(self, location, radius=5000, queries=None, profile=DEFAULT_SEARCH_PROFILE):
         if queries is None:
             queries = ["tourist_attraction", "museum", "park"]
-        
+        if not queries:
+            return []
+
         combined_results = {}
-        def distribute_sum(m, n):
-            base_value = m // n
-            remainder = m % n
-            result = [base_value] * n
-            for i in range(remainder):
-                result[i] += 1
-            
-            return result
-        num_searches = distribute_sum(12, len(queries))
-        for i in range(len(queries)):
-            result = self._search_nearby_places_mini(queries[i], location, radius, num_searches[i])
-            logger.info(f"\n\nSearch query: {queries[i]}")
+        num_searches = self._distribute_searches(12, len(queries))
+        # Run the queries concurrently; map() keeps results in query order so the merge stays deterministic
+        results = self.executor.map(
+            self._search_nearby_places_mini, queries, repeat(location), repeat(radius), num_searches, repeat(profile)
+        )
+        for query, result in zip(queries, results):
+            logger.info(f"\n\nSearch query: {query}")
             logger.info(f"result: {json.dumps([r["title"] for r in result])}")
             for r in result:
                 combined_results[r["place_id"]] = r
-            time.sleep(0.5)
 
         return list(combined_results.values())
 
-    def search_nearby_places(self, query, location, radius=5000):
-        headers = self._construct_map_headers()
+    def search_nearby_places(self, query, location, radius=5000, profile=DEFAULT_SEARCH_PROFILE):
+        cache_key = self._search_cache_key("searchText", query, location, radius, 60, profile)
+        cached_results = self.search_cache.get(cache_key)
+        if cached_results is not None:
+            return self._construct_places_data(cached_results, location)
+
+        headers = self._construct_map_headers(profile)
         payload = self._construct_map_text_search_payload(query=query, location=location, radius=radius)
-        url = "https://places.googleapis.com/v1/places:searchText"
 
         combined_results = []
         next_page_token = None
+        complete = True
 
         while len(combined_results) < 60:
             if next_page_token:
                 payload['pageToken'] = next_page_token
 
-            response = requests.post(url, headers=headers, data=json.dumps(payload))
+            response = self._request("POST", self.PLACES_TEXT_SEARCH_URL, headers=headers, data=json.dumps(payload))
             if response.status_code == 200:
                 results = response.json().get('places', [])
                 combined_results += results
@@ -320,56 +610,62 @@ class Maps:
                     break
             else:
                 print(f"Error fetching data: {response.status_code}, {response.text}")
+                complete = False
                 break
-            time.sleep(0.5)
 
         combined_results = combined_results[:60]
+        # Don't cache a partial page set from a failed request
+        if complete:
+            self.search_cache.set(cache_key, combined_results)
 
-        return self._construct_places_data(combined_results, location)
+        places = self._construct_places_data(combined_results, location)
+        self._add_to_index(places)
+        return places
 
     def get_place_details(self, place_id, origin=None) -> dict:
-        headers = self._construct_map_details_headers()
-        url = f"https://places.googleapis.com/v1/places/{place_id}"
+        # The raw payload is cached; distance is computed per request from origin
+        place = self.details_cache.get(place_id)
+        if place is None:
+            headers = self._construct_map_details_headers()
+            url = self.PLACES_DETAILS_URL.format(place_id=place_id)
 
-        response = requests.get(url, headers=headers)
-        if response.status_code == 200:
-            place = response.json()
-            return self._construct_place_details_data(place, origin)
-        else:
-            print(f"Error fetching place details: {response.status_code}, {response.text}")
-            return None
+            response = self._request("GET", url, headers=headers)
+            if response.status_code == 200:
+                place = response.json()
+                self.details_cache.set(place_id, place)
+            else:
+                print(f"Error fetching place details: {response.status_code}, {response.text}")
+                return None
+        return self._construct_place_details_data(place, origin)
 
-    def get_place_id(self, url):
+    def _fetch_html_head(self, url):
+        # Streamed and not coalesced: a streamed body can only be read by one caller
+        response = self._send("GET", url, stream=True)
+        head = b""
         try:
-            # Send a GET request to the URL
-            response = requests.get(url)
-
-            # Parse the HTML content using Beautiful Soup
-            soup = BeautifulSoup(response.text, "html.parser")
+            for chunk in response.iter_content(chunk_size=8192):
+                head += chunk
+                if b"</head>" in head.lower() or len(head) >= self.HTML_HEAD_MAX_BYTES:
+                    break
+        finally:
+            response.close()
+        return head.decode(response.encoding or "utf-8", errors="replace")
 
-            # Find the meta tag with itemprop="name"
-            meta_tag = soup.find("meta", itemprop="name")
-            if meta_tag:
-                # Get the content attribute of the meta tag
-                place_name = meta_tag.get("content")
-            else:
+    def get_place_id(self, url):
+        place_id = self.get_place_id_offline(url)
+        if place_id:
+            return place_id
+        try:
+            # Fall back to the name in the URL path, then to the page's <meta itemprop="name">
+            place_name = place_name_from_url(url) or place_name_from_head(self._fetch_html_head(url))
+            if not place_name:
                 return None
 
-            query_url = (
-                "https://maps.googleapis.com/maps/api/place/queryautocomplete/json"
-            )
-
-            # Query parameters
-            params = {
-                "input": place_name,
-                "types": "geocode",
-                "key": {self.MAPS_API_KEY},
-            }
-            # Send a GET request
-            response = requests.get(query_url, params=params)
+            response = self._request("GET", self.PLACES_QUERY_AUTOCOMPLETE_URL, params=self._autocomplete_params(place_name))
             predictions = response.json()["predictions"]
             if predictions:
                 place_id = predictions[0]["place_id"]
+                self.place_id_cache.set(url, place_id)
                 return place_id
             else:
                 return None
@@ -0,0 +1,127 @@
+import re
+import numpy as np
+
+# Relative weight of each signal in the final score; every feature is scaled to [0, 1]
+DEFAULT_WEIGHTS = {
+    "match": 0.45,
+    "rating": 0.2,
+    "popularity": 0.15,
+    "distance": 0.15,
+    "open_now": 0.05,
+}
+# Places with few reviews are pulled towards this rating (Bayesian average)
+PRIOR_RATING = 3.5
+PRIOR_REVIEWS = 20
+INTEREST_WEIGHT = 1.0
+VISITED_TYPE_WEIGHT = 0.5
+# Types on almost every place say nothing about the user's taste
+GENERIC_TYPES = {"point_of_interest", "establishment"}
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def _tokens(text: str) -> set:
+    # "italian_restaurant" -> {"italian", "restaurant"}
+    return set(_TOKEN_PATTERN.findall(text.lower()))
+
+
+def build_keywords(interests: list, visited_types: list, query: str = "") -> dict:
+    """
+    Weighted keyword profile used to match places against a user.
+
+    Args:
+        interests (list): the user's interests
+        visited_types (list): place types of the user's visited places, repeated per visit
+        query (str): optional search query, weighted like an interest
+
+    Returns:
+        dict: token to weight in [0, 1]
+    """
+    keywords = {}
+    type_counts = {}
+    for place_type in visited_types:
+        if place_type not in GENERIC_TYPES:
+            for token in _tokens(place_type):
+                type_counts[token] = type_counts.get(token, 0) + 1
+    most_visited = max(type_counts.values(), default=1)
+    for token, count in type_counts.items():
+        keywords[token] = VISITED_TYPE_WEIGHT * count / most_visited
+    for text in list(interests) + [query]:
+        for token in _tokens(str(text)):
+            keywords[token] = INTEREST_WEIGHT
+    return keywords
+
+
+def _place_tokens(place: dict) -> set:
+    tokens = _tokens(place.get("title") or "")
+    for place_type in [place.get("primaryType") or ""] + place.get("types", []):
+        if place_type not in GENERIC_TYPES:
+            tokens |= _tokens(place_type)
+    return tokens
+
+
+def score_places(places: list, keywords: dict, weights: dict = None) -> np.ndarray:
+    """
+    Scores candidate places for a user, one vectorized pass over the candidate list.
+
+    Args:
+        places (list): constructed place dicts (see Maps._construct_places_data)
+        keywords (dict): token weights from build_keywords()
+        weights (dict): feature weights, defaults to DEFAULT_WEIGHTS
+
+    Returns:
+        np.ndarray: one score per place, higher is better
+    """
+    weights = weights or DEFAULT_WEIGHTS
+    if not places:
+        return np.zeros(0)
+
+    place_tokens = [_place_tokens(place) for place in places]
+    vocabulary = sorted(set(keywords).union(*place_tokens))
+    column = {token: index for index, token in enumerate(vocabulary)}
+    membership = np.zeros((len(places), len(vocabulary)))
+    for row, tokens in enumerate(place_tokens):
+        membership[row, [column[token] for token in tokens]] = 1.0
+    keyword_weights = np.array([keywords.get(token, 0.0) for token in vocabulary])
+    # Best-matching tokens dominate: a place matching two strong keywords scores 1
+    match = np.minimum(membership @ keyword_weights / 2.0, 1.0)
+
+    ratings = np.array([place.get("rating") or np.nan for place in places], dtype=float)
+    counts = np.array([place.get("userRatingCount") or 0 for place in places], dtype=float)
+    ratings = np.where(np.isnan(ratings), PRIOR_RATING, ratings)
+    rating = ((ratings * counts + PRIOR_RATING * PRIOR_REVIEWS) / (counts + PRIOR_REVIEWS) - 1.0) / 4.0
+
+    log_counts = np.log1p(counts)
+    popularity = log_counts / log_counts.max() if log_counts.max() > 0 else np.zeros(len(places))
+
+    distances = np.array([place.get("distance", np.nan) for place in places], dtype=float)
+    if np.all(np.isnan(distances)):
+        distance = np.full(len(places), 0.5)
+    else:
+        # Halves every median distance; places without coordinates are neutral
+        scale = max(np.nanmedian(distances), 0.1)
+        distance = np.where(np.isnan(distances), 0.5, np.power(0.5, distances / scale))
+
+    open_now = np.array(
+        [{True: 1.0, False: 0.0}.get(place.get("open_now"), 0.5) for place in places]
+    )
+
+    return (
+        weights["match"] * match
+        + weights["rating"] * rating
+        + weights["popularity"] * popularity
+        + weights["distance"] * distance
+        + weights["open_now"] * open_now
+    )
+
+
+def rank_places(places: list, keywords: dict, top_k: int = None, weights: dict = None) -> list:
+    """
+    Returns:
+        list: the places ordered by score_places(), best first, ties in input order
+    """
+    scores = score_places(places, keywords, weights)
+    order = np.argsort(-scores, kind="stable")
+    if top_k is not None:
+        order = order[:top_k]
+    return [places[index] for index in order]
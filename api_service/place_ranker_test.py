@@ -0,0 +1,43 @@
+import unittest
+from place_ranker import build_keywords, rank_places
+
+
+def make_place(place_id, types, rating=4.0, count=100, distance=1.0, open_now=None):
+    return {
+        "place_id": place_id,
+        "title": place_id,
+        "types": types,
+        "rating": rating,
+        "userRatingCount": count,
+        "distance": distance,
+        "open_now": open_now,
+    }
+
+
+class TestPlaceRanker(unittest.TestCase):
+
+    def test_interest_match_outranks_generic_popularity(self):
+        keywords = build_keywords(interests=["hiking"], visited_types=["park", "hiking_area"])
+        places = [
+            make_place("mall", ["shopping_mall", "point_of_interest"], rating=4.5, count=5000),
+            make_place("trail", ["hiking_area", "point_of_interest"], rating=4.4, count=300),
+        ]
+        self.assertEqual([place["place_id"] for place in rank_places(places, keywords)], ["trail", "mall"])
+
+    def test_open_and_close_breaks_ties_and_top_k(self):
+        places = [
+            make_place("far", ["cafe"], distance=5.0),
+            make_place("closed", ["cafe"], open_now=False),
+            make_place("open", ["cafe"], open_now=True),
+        ]
+        ranked = rank_places(places, build_keywords(["coffee"], []), top_k=2)
+        self.assertEqual([place["place_id"] for place in ranked], ["open", "closed"])
+
+    def test_missing_fields_do_not_fail(self):
+        places = [{"place_id": "bare"}, make_place("full", ["museum"])]
+        self.assertEqual(len(rank_places(places, {})), 2)
+        self.assertEqual(rank_places([], {}), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
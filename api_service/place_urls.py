@@ -0,0 +1,70 @@
+import re
+import base64
+from urllib.parse import urlparse, parse_qs, unquote_plus
+from bs4 import BeautifulSoup
+
+# Google Takeout saved-place URLs carry the place either as a Places ID, as a
+# feature ID ("0x<hex>:0x<hex>", in the ftid param or the !1s data segment) or
+# only by name in the /maps/place/<name>/ path. Legacy ?cid=<decimal> URLs are
+# not resolved here: the CID is only the low half of the feature ID, and the
+# Places API has no CID lookup, so they go through the name lookup in Maps.get_place_id.
+_PLACE_ID_PATTERN = re.compile(r"\bChIJ[0-9A-Za-z_-]{23}\b")
+_FEATURE_ID_PATTERN = re.compile(r"(0x[0-9a-fA-F]{1,16}):(0x[0-9a-fA-F]{1,16})")
+_PLACE_NAME_PATTERN = re.compile(r"/maps/place/([^/@?]+)")
+
+
+def feature_id_to_place_id(feature_id: str) -> str:
+    """
+    Converts a Maps feature ID ("0x<hex>:0x<hex>") to the equivalent ChIJ Places ID.
+
+    A ChIJ place ID is the URL-safe base64 of a small protobuf holding the two
+    64-bit halves of the feature ID as fixed64 fields.
+    """
+    high, low = (int(part, 16) for part in feature_id.split(":"))
+    message = b"\x0a\x12\x09" + high.to_bytes(8, "little") + b"\x11" + low.to_bytes(8, "little")
+    return base64.urlsafe_b64encode(message).decode("ascii").rstrip("=")
+
+
+def place_id_from_url(url: str):
+    """
+    Extracts a Places ID encoded in a Google Maps URL without any network call.
+
+    Returns:
+        str or None: the place ID, or None if the URL does not carry one (including cid-only URLs)
+    """
+    if not url:
+        return None
+    params = parse_qs(urlparse(url).query)
+    for param in ("query_place_id", "place_id"):
+        if params.get(param):
+            return params[param][0]
+
+    match = _PLACE_ID_PATTERN.search(url)
+    if match:
+        return match.group(0)
+
+    for candidate in params.get("ftid", []) + [unquote_plus(url)]:
+        match = _FEATURE_ID_PATTERN.search(candidate)
+        if match:
+            return feature_id_to_place_id(f"{match.group(1)}:{match.group(2)}")
+    return None
+
+
+def place_name_from_url(url: str):
+    """
+    Returns:
+        str or None: the place name from a /maps/place/<name>/ URL path
+    """
+    match = _PLACE_NAME_PATTERN.search(urlparse(url or "").path)
+    if match:
+        return unquote_plus(match.group(1)).strip() or None
+    return None
+
+
+def place_name_from_head(html_head: str):
+    """
+    Returns:
+        str or None: content of the <meta itemprop="name"> tag in the document head
+    """
+    meta_tag = BeautifulSoup(html_head, "html.parser").find("meta", itemprop="name")
+    return meta_tag.get("content") if meta_tag else None
@@ -0,0 +1,27 @@
+import unittest
+from place_urls import place_id_from_url, place_name_from_url, place_name_from_head
+
+EMPIRE_STATE_PLACE_ID = "ChIJaXQRs6lZwokRY6EFpJnhNNE"
+
+
+class TestPlaceUrls(unittest.TestCase):
+
+    def test_feature_id_in_data_segment(self):
+        url = "https://www.google.com/maps/place/Empire+State+Building/data=!4m2!3m1!1s0x89c259a9b3117469:0xd134e199a405a163"
+        self.assertEqual(place_id_from_url(url), EMPIRE_STATE_PLACE_ID)
+
+    def test_place_id_param(self):
+        url = f"https://www.google.com/maps/search/?api=1&query=x&query_place_id={EMPIRE_STATE_PLACE_ID}"
+        self.assertEqual(place_id_from_url(url), EMPIRE_STATE_PLACE_ID)
+
+    def test_cid_only_needs_lookup(self):
+        self.assertIsNone(place_id_from_url("http://maps.google.com/?cid=15074467423479341411"))
+
+    def test_place_name(self):
+        self.assertEqual(place_name_from_url("https://www.google.com/maps/place/Caf%C3%A9+Zoe/@1,2"), "Café Zoe")
+        head = '<html><head><meta content="Empire State Building" itemprop="name"></head>'
+        self.assertEqual(place_name_from_head(head), "Empire State Building")
+
+
+if __name__ == "__main__":
+    unittest.main()
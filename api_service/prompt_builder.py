@@ -0,0 +1,167 @@
+import json
+import threading
+
+import logging
+logger = logging.getLogger(__name__)
+
+# Rough size of a Gemini token for English text and JSON
+CHARS_PER_TOKEN = 4
+# Token budget per prompt section; sections without a budget are only compacted
+DEFAULT_SECTION_BUDGETS = {
+    "visited_places": 1500,
+    "interests": 200,
+    "userDescription": 300,
+    "geminiDescription": 400,
+    "places": 6000,
+    "place": 800,
+    # Fits LLMTools.SCRAPED_CONTEXT_WORDS of selected content plus links and snippets
+    "additional_info": 3000,
+}
+_EMPTY = (None, "", [], {})
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def compact(value):
+    """
+    Drops empty fields from dicts (recursively) and repeated strings from lists.
+    """
+    if isinstance(value, dict):
+        compacted = {key: compact(item) for key, item in value.items()}
+        return {key: item for key, item in compacted.items() if item not in _EMPTY}
+    if isinstance(value, list):
+        items = [compact(item) for item in value]
+        if all(isinstance(item, str) for item in items):
+            items = list(dict.fromkeys(items))
+        return [item for item in items if item not in _EMPTY]
+    return value
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def compact_json(value) -> str:
+    return _dumps(compact(value))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cuts text at a word boundary so it fits the token budget."""
+    max_chars = max(max_tokens, 0) * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0] + " ..."
+
+
+def truncate_words(text: str, max_words: int) -> str:
+    words = text.split()
+    if len(words) <= max_words:
+        return text
+    return " ".join(words[:max_words]) + " ..."
+
+
+def _shrink(item, max_tokens: int):
+    """
+    Truncates the string fields of an item, longest first, until it fits `max_tokens`.
+
+    Returns:
+        the truncated item, or None if it cannot fit
+    """
+    if isinstance(item, str):
+        # Leave room for the quotes and escapes
+        item = truncate_tokens(item, max_tokens - 2)
+    elif isinstance(item, dict):
+        item = dict(item)
+        for key in sorted(item, key=lambda key: -len(item[key]) if isinstance(item[key], str) else 0):
+            excess = estimate_tokens(_dumps(item)) - max_tokens
+            if excess <= 0 or not isinstance(item[key], str):
+                break
+            item[key] = truncate_tokens(item[key], max(estimate_tokens(item[key]) - excess - 2, 0))
+    return item if estimate_tokens(_dumps(item)) <= max_tokens else None
+
+
+def _fit_list(items: list, max_tokens: int) -> list:
+    # Keeps the leading items, so callers should pass them most important first.
+    # The first item that does not fit whole is truncated into what is left.
+    kept = []
+    used = 2
+    for item in items:
+        size = estimate_tokens(_dumps(item)) + 1
+        if used + size > max_tokens:
+            shrunk = _shrink(item, max_tokens - used - 1)
+            if shrunk is not None:
+                kept.append(shrunk)
+            break
+        used += size
+        kept.append(item)
+    return kept
+
+
+def fit_to_budget(value, max_tokens: int = None) -> str:
+    """
+    Serializes a prompt section compactly, trimming it to `max_tokens`.
+
+    Strings are truncated, lists keep their leading items, and dicts trim their
+    list fields to whatever budget the other fields leave.
+
+    Returns:
+        str: the section text (compact JSON for lists and dicts)
+    """
+    if isinstance(value, str):
+        return value if max_tokens is None else truncate_tokens(value, max_tokens)
+    value = compact(value)
+    text = compact_json(value)
+    if max_tokens is None or estimate_tokens(text) <= max_tokens:
+        return text
+    if isinstance(value, list):
+        return compact_json(_fit_list(value, max_tokens))
+    if isinstance(value, dict):
+        fixed = {key: item for key, item in value.items() if not isinstance(item, list)}
+        remaining = max_tokens - estimate_tokens(compact_json(fixed))
+        lists = {key: item for key, item in value.items() if isinstance(item, list)}
+        for key, items in lists.items():
+            lists[key] = _fit_list(items, max(remaining // len(lists), 0))
+        return compact_json({**fixed, **lists})
+    return text
+
+
+class PromptBuilder:
+    """
+    Renders prompt sections within per-section token budgets and tracks prompt
+    sizes per LLM call site.
+    """
+
+    def __init__(self, budgets: dict = None):
+        self.budgets = {**DEFAULT_SECTION_BUDGETS, **(budgets or {})}
+        self._lock = threading.Lock()
+        self._sizes = {}
+
+    def render(self, **sections) -> dict:
+        """
+        Args:
+            **sections: section name to value (str, list or dict)
+
+        Returns:
+            dict: section name to text, compacted and trimmed to the section's budget
+        """
+        rendered = {}
+        for name, value in sections.items():
+            rendered[name] = fit_to_budget(value, self.budgets.get(name))
+            logger.debug(f"Prompt section {name}: ~{estimate_tokens(rendered[name])} tokens")
+        return rendered
+
+    def record(self, call_site: str, prompt: str):
+        tokens = estimate_tokens(prompt)
+        logger.info(f"Prompt size for {call_site or 'unnamed'}: ~{tokens} tokens")
+        with self._lock:
+            count, total, largest = self._sizes.get(call_site, (0, 0, 0))
+            self._sizes[call_site] = (count + 1, total + tokens, max(largest, tokens))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                str(call_site): {"calls": count, "avg_tokens": total // count, "max_tokens": largest}
+                for call_site, (count, total, largest) in self._sizes.items()
+            }
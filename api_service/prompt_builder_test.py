@@ -0,0 +1,58 @@
+import json
+import unittest
+from prompt_builder import PromptBuilder, compact, compact_json, estimate_tokens, fit_to_budget
+
+
+class TestCompact(unittest.TestCase):
+
+    def test_drops_empty_fields_and_duplicate_types(self):
+        place = {"title": "Tate", "summary": "", "types": ["museum", "museum", "art_gallery"], "reviews": [], "rating": None}
+        self.assertEqual(compact(place), {"title": "Tate", "types": ["museum", "art_gallery"]})
+        self.assertEqual(compact_json(place), '{"title":"Tate","types":["museum","art_gallery"]}')
+
+
+class TestFitToBudget(unittest.TestCase):
+
+    def test_string_is_truncated_at_a_word(self):
+        text = fit_to_budget("word " * 100, max_tokens=10)
+        self.assertLessEqual(estimate_tokens(text), 12)
+        self.assertTrue(text.endswith("word ..."))
+
+    def test_list_fields_keep_leading_items(self):
+        visited = {"visited places": [{"title": f"Place {i}", "types": ["park"]} for i in range(100)]}
+        text = fit_to_budget(visited, max_tokens=100)
+        places = json.loads(text)["visited places"]
+        self.assertLessEqual(estimate_tokens(text), 100)
+        self.assertEqual(places[0]["title"], "Place 0")
+        self.assertLess(len(places), 100)
+
+    def test_oversized_item_is_truncated_not_dropped(self):
+        pages = [{"link": "https://example.com", "content": " ".join(["architecture"] * 1500)}, {"link": "https://other.com"}]
+        text = fit_to_budget(pages, max_tokens=500)
+        kept = json.loads(text)
+        self.assertLessEqual(estimate_tokens(text), 500)
+        self.assertEqual(len(kept), 1)
+        self.assertEqual(kept[0]["link"], "https://example.com")
+        self.assertTrue(kept[0]["content"].startswith("architecture architecture"))
+
+    def test_within_budget_is_unchanged(self):
+        self.assertEqual(fit_to_budget({"interests": ["art"]}, max_tokens=100), '{"interests":["art"]}')
+
+
+class TestPromptBuilder(unittest.TestCase):
+
+    def test_render_applies_section_budgets(self):
+        builder = PromptBuilder({"interests": 5})
+        rendered = builder.render(interests=[f"interest {i}" for i in range(20)], other="kept as is " * 20)
+        self.assertLessEqual(estimate_tokens(rendered["interests"]), 5)
+        self.assertEqual(rendered["other"], "kept as is " * 20)
+
+    def test_records_sizes_per_call_site(self):
+        builder = PromptBuilder()
+        builder.record("filter_places", "x" * 400)
+        builder.record("filter_places", "x" * 800)
+        self.assertEqual(builder.stats(), {"filter_places": {"calls": 2, "avg_tokens": 150, "max_tokens": 200}})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import re
+import threading
+
+# Extra phrases for place types whose own name is not how people search for them
+TYPE_SYNONYMS = {
+    "art_gallery": ["art", "galleries", "art museum"],
+    "book_store": ["bookstore", "bookshop", "books"],
+    "bowling_alley": ["bowling"],
+    "campground": ["camping", "campsite"],
+    "coffee_shop": ["coffee", "coffee place"],
+    "golf_course": ["golf"],
+    "hiking_area": ["hiking", "hike", "trail", "hiking trail"],
+    "ice_cream_shop": ["ice cream", "gelato"],
+    "lodging": ["place to stay", "accommodation"],
+    "market": ["farmers market"],
+    "movie_theater": ["movies", "movie", "cinema"],
+    "night_club": ["nightclub", "club", "clubbing", "dancing"],
+    "performing_arts_theater": ["theater", "theatre", "show", "concert hall"],
+    "shopping_mall": ["mall", "shopping"],
+    "ski_resort": ["skiing", "ski"],
+    "swimming_pool": ["pool", "swimming"],
+    "tourist_attraction": ["attraction", "sightseeing"],
+}
+# Specific foods and drinks: the answer is a text search for them, never a type
+TEXT_SEARCH_TERMS = {
+    "bubble tea", "boba", "milk tea", "matcha", "pizza", "sushi", "ramen", "pho", "tacos", "taco",
+    "burrito", "burgers", "burger", "dim sum", "dumplings", "bbq", "barbecue", "brunch", "breakfast",
+    "steak", "seafood", "oysters", "noodles", "pasta", "curry", "falafel", "shawarma", "kebab",
+    "donuts", "bagels", "cocktails", "wine", "beer", "craft beer", "dessert", "desserts", "vegan food",
+}
+# Location and request phrasing that does not change what is searched for
+_FILLER_PATTERN = re.compile(
+    r"\b(near me|nearby|near here|around here|around|close by|close to me|in the area|in town|"
+    r"i want to (go to|eat|visit|see)|i want to|i want|i'm looking for|im looking for|looking for|show me|find me|find|"
+    r"where can i (find|get|go to|eat)|where is|are there|is there|any good|any|some|good|best|great|"
+    r"places? to|spots?|please|a|an|the)\b"
+)
+_CONNECTOR_PATTERN = re.compile(r"\s*(?:,|\band\b|\bor\b|&|/)\s*")
+
+
+def _plurals(phrase: str) -> set:
+    words = phrase.split()
+    last = words[-1]
+    if last.endswith("y") and last[-2:-1] not in "aeiou":
+        plurals = {last[:-1] + "ies"}
+    elif last.endswith(("s", "x", "ch", "sh")):
+        plurals = {last + "es"}
+    else:
+        plurals = {last + "s"}
+    return {phrase} | {" ".join(words[:-1] + [plural]) for plural in plurals}
+
+
+class QueryClassifier:
+    """
+    Rule-based fast path for LLMTools.parse_query_for_search.
+
+    Answers the search-mode decision locally when the query (minus location and
+    request phrasing) is just one or more place types, or a specific food or
+    drink. Anything else returns None so the caller asks the LLM.
+    """
+
+    def __init__(self, place_types: list):
+        self.index = {}
+        for place_type in place_types:
+            phrases = {place_type.replace("_", " ")} | set(TYPE_SYNONYMS.get(place_type, []))
+            for phrase in phrases:
+                for form in _plurals(phrase):
+                    self.index.setdefault(form, place_type)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(query: str) -> str:
+        query = re.sub(r"[^\w\s,&/'-]", " ", query.lower())
+        return " ".join(query.split())
+
+    def _classify(self, query: str):
+        normalized = self._normalize(query)
+        core = " ".join(_FILLER_PATTERN.sub(" ", normalized).split())
+        if not core:
+            return None
+
+        if core in TEXT_SEARCH_TERMS:
+            return {"use_text_search": True, "text_query": core}
+
+        parts = [part for part in _CONNECTOR_PATTERN.split(core) if part]
+        place_types = [self.index.get(part) for part in parts]
+        if not parts or None in place_types:
+            return None
+        # Cuisines are specific enough that a text search finds better matches
+        if any(place_type.endswith("_restaurant") for place_type in place_types):
+            return {"use_text_search": True, "text_query": core}
+        return {"use_text_search": False, "types": list(dict.fromkeys(place_types))}
+
+    def classify(self, query: str):
+        """
+        Returns:
+            dict or None: the parse_query_for_search answer, or None when the LLM should decide
+        """
+        result = self._classify(query or "")
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
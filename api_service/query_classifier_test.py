@@ -0,0 +1,35 @@
+import unittest
+from query_classifier import QueryClassifier
+
+PLACE_TYPES = ["book_store", "hiking_area", "italian_restaurant", "library", "museum", "park"]
+
+
+class TestQueryClassifier(unittest.TestCase):
+
+    def setUp(self):
+        self.classifier = QueryClassifier(PLACE_TYPES)
+
+    def test_place_types_use_nearby_search(self):
+        self.assertEqual(self.classifier.classify("Museums"), {"use_text_search": False, "types": ["museum"]})
+        self.assertEqual(
+            self.classifier.classify("Any good book stores or libraries around?"),
+            {"use_text_search": False, "types": ["book_store", "library"]},
+        )
+        self.assertEqual(self.classifier.classify("I want to hike."), {"use_text_search": False, "types": ["hiking_area"]})
+
+    def test_dishes_and_cuisines_use_text_search(self):
+        self.assertEqual(self.classifier.classify("bubble tea near me"), {"use_text_search": True, "text_query": "bubble tea"})
+        self.assertEqual(
+            self.classifier.classify("italian restaurants nearby"),
+            {"use_text_search": True, "text_query": "italian restaurants"},
+        )
+
+    def test_unsure_queries_fall_back_and_are_counted(self):
+        self.assertIsNone(self.classifier.classify("I'm tired but I still want to hang out."))
+        self.assertIsNone(self.classifier.classify("museums with free entry"))
+        self.classifier.classify("parks")
+        self.assertEqual(self.classifier.stats(), {"hits": 1, "misses": 2, "hit_rate": 0.3333})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,211 @@
+import time
+import heapq
+import random
+import itertools
+import threading
+
+# Priority classes for AdaptiveConcurrencyLimiter, lower is admitted first
+INTERACTIVE = 0
+BACKGROUND = 1
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket used to keep outgoing API traffic under a QPS quota.
+
+    Tokens refill continuously at `rate` per second up to `capacity`, so short
+    bursts are allowed while the long-run rate stays bounded.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._last_refill = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """
+        Takes tokens from the bucket without blocking.
+
+        Args:
+            tokens (float): number of tokens to take
+
+        Returns:
+            bool: True if the tokens were available
+        """
+        return self._wait_time(tokens) == 0
+
+    def _wait_time(self, tokens: float) -> float:
+        """Takes the tokens and returns 0, or returns how long to wait for them."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1, timeout: float = None) -> bool:
+        """
+        Blocks until tokens are available.
+
+        Args:
+            tokens (float): number of tokens to take
+            timeout (float): maximum seconds to wait, None waits forever
+
+        Returns:
+            bool: True if the tokens were acquired, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._wait_time(tokens)
+            if not wait:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+
+class AdaptiveRateLimiter(TokenBucket):
+    """
+    Token bucket whose rate tracks what the upstream tolerates (AIMD).
+
+    Every successful call raises the rate by `increase` up to `max_rate`; a
+    throttled call (e.g. HTTP 429) multiplies it by `decrease` down to `min_rate`.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        min_rate: float,
+        max_rate: float,
+        increase: float = 0.1,
+        decrease: float = 0.5,
+        capacity: float = None,
+    ):
+        super().__init__(rate, capacity)
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.throttled = 0
+
+    def on_success(self):
+        with self._lock:
+            self._refill()
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self):
+        with self._lock:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self.throttled += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"rate": round(self.rate, 3), "throttled": self.throttled}
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Caps the number of in-flight calls at a limit that tracks what the upstream
+    tolerates (AIMD).
+
+    Every successful call raises the limit by 1 / limit (about one slot per
+    window of calls) up to `max_limit`; a throttled call multiplies it by
+    `decrease` down to `min_limit`. Waiting callers are admitted by priority
+    (INTERACTIVE before BACKGROUND), then in arrival order.
+    """
+
+    def __init__(self, limit: float, min_limit: float = 1, max_limit: float = None, decrease: float = 0.5):
+        self.limit = float(limit)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit if max_limit is not None else limit)
+        self.decrease = decrease
+        self.in_flight = 0
+        self.throttled = 0
+        self.timeouts = 0
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+
+    def _can_admit(self, ticket) -> bool:
+        return self._waiting[0] == ticket and self.in_flight < int(self.limit)
+
+    def acquire(self, priority: int = INTERACTIVE, timeout: float = None) -> bool:
+        """
+        Blocks until a slot is free and no higher-priority caller is waiting.
+        Callers that get a slot must call release().
+
+        Args:
+            priority (int): INTERACTIVE or BACKGROUND
+            timeout (float): maximum seconds to wait, None waits forever
+
+        Returns:
+            bool: True if a slot was acquired, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        ticket = (priority, next(self._sequence))
+        with self._condition:
+            heapq.heappush(self._waiting, ticket)
+            while not self._can_admit(ticket):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._waiting.remove(ticket)
+                    heapq.heapify(self._waiting)
+                    self.timeouts += 1
+                    self._condition.notify_all()
+                    return False
+                self._condition.wait(remaining)
+            heapq.heappop(self._waiting)
+            self.in_flight += 1
+            # The next waiter may fit under the limit too
+            self._condition.notify_all()
+            return True
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self):
+        with self._condition:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def on_throttle(self):
+        with self._condition:
+            self.limit = max(self.min_limit, self.limit * self.decrease)
+            self.throttled += 1
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "limit": round(self.limit, 3),
+                "in_flight": self.in_flight,
+                "waiting": len(self._waiting),
+                "throttled": self.throttled,
+                "timeouts": self.timeouts,
+            }
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 8.0) -> float:
+    """
+    Exponential backoff with full jitter, so clients throttled together do not retry together.
+
+    Args:
+        attempt (int): number of failed attempts so far, starting at 0
+
+    Returns:
+        float: seconds to wait, uniform in [0, min(cap, base * 2 ** attempt)]
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
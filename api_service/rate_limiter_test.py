@@ -0,0 +1,84 @@
+import time
+import threading
+import unittest
+from rate_limiter import (
+    TokenBucket, AdaptiveRateLimiter, AdaptiveConcurrencyLimiter, INTERACTIVE, BACKGROUND, backoff_delay
+)
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_burst_up_to_capacity(self):
+        bucket = TokenBucket(rate=1, capacity=3)
+        self.assertTrue(all(bucket.try_acquire() for _ in range(3)))
+        self.assertFalse(bucket.try_acquire())
+
+    def test_acquire_waits_for_refill(self):
+        bucket = TokenBucket(rate=20, capacity=1)
+        bucket.acquire()
+        start = time.monotonic()
+        self.assertTrue(bucket.acquire())
+        self.assertGreaterEqual(time.monotonic() - start, 0.04)
+
+    def test_acquire_timeout(self):
+        bucket = TokenBucket(rate=0.1, capacity=1)
+        bucket.acquire()
+        self.assertFalse(bucket.acquire(timeout=0.05))
+
+
+class TestAdaptiveRateLimiter(unittest.TestCase):
+
+    def test_rate_backs_off_and_recovers_within_bounds(self):
+        limiter = AdaptiveRateLimiter(rate=4, min_rate=1, max_rate=5, increase=1)
+        limiter.on_throttle()
+        self.assertEqual(limiter.rate, 2)
+        limiter.on_throttle()
+        limiter.on_throttle()
+        self.assertEqual(limiter.rate, 1)
+        for _ in range(10):
+            limiter.on_success()
+        self.assertEqual(limiter.rate, 5)
+
+
+class TestAdaptiveConcurrencyLimiter(unittest.TestCase):
+
+    def test_interactive_callers_are_admitted_first(self):
+        limiter = AdaptiveConcurrencyLimiter(limit=1)
+        limiter.acquire()
+        admitted = []
+
+        def wait_for_slot(priority, name):
+            limiter.acquire(priority)
+            admitted.append(name)
+            limiter.release()
+
+        background = threading.Thread(target=wait_for_slot, args=(BACKGROUND, "background"))
+        background.start()
+        time.sleep(0.05)
+        interactive = threading.Thread(target=wait_for_slot, args=(INTERACTIVE, "interactive"))
+        interactive.start()
+        time.sleep(0.05)
+        limiter.release()
+        background.join(1)
+        interactive.join(1)
+        self.assertEqual(admitted, ["interactive", "background"])
+
+    def test_limit_halves_on_throttle_and_grows_on_success(self):
+        limiter = AdaptiveConcurrencyLimiter(limit=4, min_limit=1, max_limit=8)
+        limiter.on_throttle()
+        self.assertEqual(limiter.limit, 2)
+        limiter.acquire()
+        limiter.acquire()
+        self.assertFalse(limiter.acquire(timeout=0.01))
+        for _ in range(4):
+            limiter.on_success()
+        self.assertTrue(limiter.acquire(timeout=0.01))
+        self.assertEqual(limiter.stats()["timeouts"], 1)
+
+    def test_backoff_delay_is_bounded(self):
+        delays = [backoff_delay(attempt, base=0.5, cap=2) for attempt in range(10) for _ in range(20)]
+        self.assertTrue(all(0 <= delay <= 2 for delay in delays))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import os
+import time
+import sqlite3
+import threading
+
+
+class ScrapeCache:
+    """
+    Persistent URL-keyed cache of cleaned, truncated page content.
+
+    Entries younger than `ttl` are served as is. Older entries keep their ETag /
+    Last-Modified validators so the page can be revalidated with a conditional
+    request instead of downloaded again. The stored content is bounded by
+    `max_bytes`; least recently used pages are evicted first.
+    """
+
+    TTL = 24 * 60 * 60
+    MAX_BYTES = 200 * 1024 * 1024
+
+    def __init__(self, path: str = None, ttl: float = TTL, max_bytes: int = MAX_BYTES):
+        self.path = path or os.getenv("SCRAPE_CACHE_PATH", "/tmp/scrape_cache.sqlite3")
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    content TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    size INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at)")
+        self._total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def get(self, url: str):
+        """
+        Returns:
+            dict or None: {"content", "etag", "last_modified", "fresh"} for a cached URL
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT content, etag, last_modified, fetched_at FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            with self._db:
+                self._db.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (now, url))
+        content, etag, last_modified, fetched_at = row
+        return {
+            "content": content,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fresh": now - fetched_at < self.ttl,
+        }
+
+    def put(self, url: str, content: str, etag: str = None, last_modified: str = None):
+        now = time.time()
+        size = len(content.encode("utf-8"))
+        with self._lock:
+            previous = self._db.execute("SELECT size FROM pages WHERE url = ?", (url,)).fetchone()
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (url, content, etag, last_modified, size, now, now),
+                )
+            self._total_bytes += size - (previous[0] if previous else 0)
+            self._evict()
+
+    def mark_revalidated(self, url: str):
+        """Restarts the TTL of an entry the origin confirmed unchanged (HTTP 304)."""
+        with self._lock:
+            with self._db:
+                self._db.execute("UPDATE pages SET fetched_at = ? WHERE url = ?", (time.time(), url))
+
+    def record(self, outcome: str):
+        """Counts a lookup outcome: "hit", "revalidated" or "miss"."""
+        with self._lock:
+            if outcome == "hit":
+                self.hits += 1
+            elif outcome == "revalidated":
+                self.revalidated += 1
+            else:
+                self.misses += 1
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes:
+            row = self._db.execute("SELECT url, size FROM pages ORDER BY accessed_at LIMIT 1").fetchone()
+            if row is None:
+                break
+            with self._db:
+                self._db.execute("DELETE FROM pages WHERE url = ?", (row[0],))
+            self._total_bytes -= row[1]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.revalidated + self.misses
+            return {
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "revalidated": self.revalidated,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.revalidated) / lookups, 4) if lookups else 0.0,
+            }
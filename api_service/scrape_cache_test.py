@@ -0,0 +1,36 @@
+import os
+import tempfile
+import unittest
+from scrape_cache import ScrapeCache
+
+
+class TestScrapeCache(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "scrape_cache.sqlite3")
+
+    def test_entry_goes_stale_but_keeps_validators(self):
+        cache = ScrapeCache(self.path, ttl=0)
+        cache.put("https://example.com", "page text", etag='"abc"')
+        entry = cache.get("https://example.com")
+        self.assertFalse(entry["fresh"])
+        self.assertEqual(entry["etag"], '"abc"')
+        self.assertEqual(entry["content"], "page text")
+
+    def test_least_recently_used_pages_are_evicted(self):
+        cache = ScrapeCache(self.path, max_bytes=10)
+        cache.put("https://a.com", "aaaa")
+        cache.put("https://b.com", "bbbb")
+        cache.get("https://a.com")
+        cache.put("https://c.com", "cccc")
+        self.assertIsNone(cache.get("https://b.com"))
+        self.assertIsNotNone(cache.get("https://a.com"))
+        self.assertEqual(cache.stats()["bytes"], 8)
+
+    def test_cache_is_persisted(self):
+        ScrapeCache(self.path).put("https://example.com", "page text")
+        self.assertTrue(ScrapeCache(self.path).get("https://example.com")["fresh"])
+
+
+if __name__ == "__main__":
+    unittest.main()
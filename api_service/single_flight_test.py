@@ -0,0 +1,46 @@
+import time
+import threading
+import unittest
+from single_flight import SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_concurrent_calls_share_one_execution(self):
+        single_flight = SingleFlight()
+        executions = []
+        results = []
+
+        def slow_call():
+            executions.append(1)
+            time.sleep(0.1)
+            return "result"
+
+        threads = [
+            threading.Thread(target=lambda: results.append(single_flight.do("key", slow_call)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(executions), 1)
+        self.assertEqual(results, ["result"] * 5)
+        stats = single_flight.stats()
+        self.assertEqual(stats["coalesced"], 4)
+        self.assertEqual(stats["in_flight"], 0)
+
+    def test_exception_is_propagated_and_key_released(self):
+        single_flight = SingleFlight()
+
+        def failing_call():
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            single_flight.do("key", failing_call)
+        self.assertEqual(single_flight.do("key", lambda: 1), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
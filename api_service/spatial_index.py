@@ -0,0 +1,340 @@
+import os
+import json
+import math
+import time
+import sqlite3
+import threading
+from geo import encode_geohash, haversine_distances
+
+METERS_PER_DEGREE_LAT = 111320
+METERS_PER_MILE = 1609.34
+
+
+def geohash_cell_size(precision: int):
+    """
+    Returns:
+        tuple: (height, width) in degrees of a geohash cell at the given precision
+    """
+    # Geohash interleaves bits starting with longitude, so longitude gets the odd bit
+    lat_bits = (5 * precision) // 2
+    lng_bits = 5 * precision - lat_bits
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+
+def covering_cells(latitude: float, longitude: float, radius: float, precision: int) -> set:
+    """
+    Geohash cells at the given precision that intersect the bounding box of a circle.
+
+    Args:
+        latitude (float): circle center
+        longitude (float): circle center
+        radius (float): circle radius in meters
+        precision (int): geohash precision of the returned cells
+
+    Returns:
+        set: geohash strings
+    """
+    height, width = geohash_cell_size(precision)
+    dlat = radius / METERS_PER_DEGREE_LAT
+    dlng = radius / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(latitude)), 1e-6))
+    min_lat, max_lat = max(latitude - dlat, -90.0), min(latitude + dlat, 90.0)
+    min_lng, max_lng = longitude - dlng, longitude + dlng
+
+    cells = set()
+    lat = min_lat
+    while True:
+        lng = min_lng
+        while True:
+            wrapped_lng = ((lng + 180.0) % 360.0) - 180.0
+            cells.add(encode_geohash(lat, wrapped_lng, precision))
+            if lng >= max_lng:
+                break
+            lng = min(lng + width, max_lng)
+        if lat >= max_lat:
+            break
+        lat = min(lat + height, max_lat)
+    return cells
+
+
+def _distances_in_meters(latitude: float, longitude: float, latitudes: list, longitudes: list):
+    return haversine_distances(latitude, longitude, latitudes, longitudes, decimals=6) * METERS_PER_MILE
+
+
+class PlaceIndex:
+    """
+    Persistent geohash-grid index of places previously returned by the Places API.
+
+    Places are stored in SQLite by geohash cell and read per query, so memory use
+    does not grow with the index. Places not refreshed within `place_ttl` are
+    dropped, and past `max_places` the least recently updated ones are evicted.
+    Searches record the circle they covered for a given scope (e.g. a set of
+    place types); a later search over the same scope is answered locally while
+    its circle lies inside a fresh covered circle.
+    """
+
+    CELL_PRECISION = 5
+    COVERAGE_TTL = 6 * 60 * 60
+    PLACE_TTL = 7 * 24 * 60 * 60
+    MAX_PLACES = 50000
+    # Places written between eviction passes
+    EVICT_EVERY = 500
+    # Per-request fields that are not stored
+    TRANSIENT_FIELDS = {"distance"}
+    # Largest circle a search can cover (Places searchNearby's maximum radius)
+    MAX_COVERED_RADIUS = 50000
+    # Stay under SQLite's bound parameter limit
+    _BATCH_SIZE = 500
+
+    def __init__(
+        self,
+        path: str = None,
+        cell_precision: int = CELL_PRECISION,
+        coverage_ttl: float = COVERAGE_TTL,
+        place_ttl: float = PLACE_TTL,
+        max_places: int = MAX_PLACES,
+    ):
+        self.path = path or os.getenv("PLACE_INDEX_PATH", "/tmp/place_index.sqlite3")
+        self.cell_precision = cell_precision
+        self.coverage_ttl = coverage_ttl
+        self.place_ttl = place_ttl
+        self.max_places = max_places
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._create_tables()
+        with self._lock:
+            self._evict()
+
+    def _create_tables(self):
+        with self._db:
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS places (
+                    place_id TEXT PRIMARY KEY,
+                    cell TEXT NOT NULL,
+                    latitude REAL NOT NULL,
+                    longitude REAL NOT NULL,
+                    types TEXT,
+                    rating REAL,
+                    user_rating_count INTEGER,
+                    opening_hours TEXT,
+                    data TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS places_cell ON places (cell)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS places_updated_at ON places (updated_at)")
+            # Per-cell coverage claimed whole cells for small searches, it is not reusable
+            self._db.execute("DROP TABLE IF EXISTS coverage")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS coverage_circles (
+                    scope TEXT NOT NULL,
+                    latitude REAL NOT NULL,
+                    longitude REAL NOT NULL,
+                    radius REAL NOT NULL,
+                    covered_at REAL NOT NULL,
+                    result_count INTEGER,
+                    PRIMARY KEY (scope, latitude, longitude, radius)
+                )
+                """
+            )
+
+    def _select_in(self, sql: str, values: list, *params):
+        # Runs `sql` (with a {} placeholder for the IN list) over `values` in batches
+        values = list(values)
+        rows = []
+        for start in range(0, len(values), self._BATCH_SIZE):
+            batch = values[start:start + self._BATCH_SIZE]
+            placeholders = ", ".join("?" * len(batch))
+            rows += self._db.execute(sql.format(placeholders), (*params, *batch)).fetchall()
+        return rows
+
+    def _evict(self):
+        now = time.time()
+        with self._db:
+            expired = self._db.execute("DELETE FROM places WHERE updated_at < ?", (now - self.place_ttl,)).rowcount
+            self._db.execute("DELETE FROM coverage_circles WHERE covered_at < ?", (now - self.coverage_ttl,))
+            excess = self._db.execute("SELECT COUNT(*) FROM places").fetchone()[0] - self.max_places
+            if excess > 0:
+                oldest = self._db.execute(
+                    "SELECT place_id, latitude, longitude FROM places ORDER BY updated_at LIMIT ?", (excess,)
+                ).fetchall()
+                self._forget_coverage_of([(latitude, longitude) for _, latitude, longitude in oldest])
+                self._select_in("DELETE FROM places WHERE place_id IN ({})", [place_id for place_id, _, _ in oldest])
+        self.evicted += expired + max(excess, 0)
+
+    def _forget_coverage_of(self, points: list):
+        # Circles losing places are no longer complete, so they have to be searched again
+        circles = self._db.execute("SELECT rowid, latitude, longitude, radius FROM coverage_circles").fetchall()
+        stale = []
+        for rowid, latitude, longitude, radius in circles:
+            distances = _distances_in_meters(
+                latitude, longitude, [point[0] for point in points], [point[1] for point in points]
+            )
+            if (distances <= radius).any():
+                stale.append(rowid)
+        self._select_in("DELETE FROM coverage_circles WHERE rowid IN ({})", stale)
+
+    def add_places(self, places: list):
+        """
+        Upserts constructed place dicts (see Maps._construct_places_data).
+        Per-request fields such as distance are not stored.
+        """
+        records = {}
+        for place in places:
+            location = place.get("location") or {}
+            if place.get("place_id") and location.get("latitude") is not None and location.get("longitude") is not None:
+                records[place["place_id"]] = {
+                    key: value for key, value in place.items() if key not in self.TRANSIENT_FIELDS
+                }
+        if not records:
+            return
+
+        now = time.time()
+        with self._lock:
+            existing = dict(self._select_in("SELECT place_id, data FROM places WHERE place_id IN ({})", records))
+            rows = []
+            for place_id, record in records.items():
+                if place_id in existing:
+                    # Results fetched with a lighter field mask must not blank out richer stored fields
+                    record = {
+                        **json.loads(existing[place_id]),
+                        **{key: value for key, value in record.items() if value not in (None, "", [], {})},
+                    }
+                latitude, longitude = record["location"]["latitude"], record["location"]["longitude"]
+                rows.append((
+                    place_id, encode_geohash(latitude, longitude, self.cell_precision), latitude, longitude,
+                    json.dumps(record.get("types", [])), record.get("rating"), record.get("userRatingCount"),
+                    json.dumps(record.get("currentOpeningHours", [])), json.dumps(record), now,
+                ))
+            with self._db:
+                self._db.executemany("INSERT OR REPLACE INTO places VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._writes += len(rows)
+            if self._writes >= self.EVICT_EVERY:
+                self._writes = 0
+                self._evict()
+
+    def mark_covered(
+        self, scope: str, latitude: float, longitude: float, radius: float, result_count: int, max_results: int = None
+    ) -> bool:
+        """
+        Records that a search for `scope` over the given circle has just been run against Google.
+
+        Args:
+            result_count (int): number of places the search returned
+            max_results (int): the search's result cap; a capped search may have missed
+                places, so its area is not recorded as covered
+
+        Returns:
+            bool: True if the area was recorded as covered
+        """
+        if max_results is not None and result_count >= max_results:
+            return False
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO coverage_circles VALUES (?, ?, ?, ?, ?, ?)",
+                (scope, latitude, longitude, radius, time.time(), result_count),
+            )
+        return True
+
+    def is_fresh(self, scope: str, latitude: float, longitude: float, radius: float) -> bool:
+        """
+        True when the circle lies inside a circle covered for `scope` within the TTL.
+        """
+        oldest_allowed = time.time() - self.coverage_ttl
+        # A containing circle's center is within MAX_COVERED_RADIUS of this one's
+        dlat = self.MAX_COVERED_RADIUS / METERS_PER_DEGREE_LAT
+        with self._lock:
+            circles = self._db.execute(
+                """
+                SELECT latitude, longitude, radius FROM coverage_circles
+                WHERE scope = ? AND covered_at >= ? AND latitude BETWEEN ? AND ? AND radius >= ?
+                """,
+                (scope, oldest_allowed, latitude - dlat, latitude + dlat, radius),
+            ).fetchall()
+        if not circles:
+            return False
+        distances = _distances_in_meters(
+            latitude, longitude, [circle[0] for circle in circles], [circle[1] for circle in circles]
+        )
+        return any(distance + radius <= circle[2] for distance, circle in zip(distances, circles))
+
+    def query(self, latitude: float, longitude: float, radius: float, types=None, limit: int = None) -> list:
+        """
+        Places within `radius` meters of the point, optionally restricted to places that
+        have any of `types`, most reviewed first.
+
+        Returns:
+            list: the stored place dicts
+        """
+        wanted_types = set(types or [])
+        cells = covering_cells(latitude, longitude, radius, self.cell_precision)
+        with self._lock:
+            rows = self._select_in("SELECT data FROM places WHERE cell IN ({})", cells)
+        candidates = [
+            record
+            for record in (json.loads(data) for data, in rows)
+            if not wanted_types or wanted_types.intersection(record.get("types", []))
+        ]
+        if not candidates:
+            return []
+
+        distances = _distances_in_meters(
+            latitude, longitude,
+            [place["location"]["latitude"] for place in candidates],
+            [place["location"]["longitude"] for place in candidates],
+        )
+        results = [place for place, distance in zip(candidates, distances) if distance <= radius]
+        results.sort(key=lambda place: place.get("userRatingCount") or 0, reverse=True)
+        return results[:limit] if limit else results
+
+    def lookup(self, scope: str, latitude: float, longitude: float, radius: float, types=None, limit: int = None):
+        """
+        Answers a scoped nearby search from the index if the area is fresh.
+
+        Returns:
+            list or None: matching places, or None when the area is cold and Google must be queried
+        """
+        fresh = self.is_fresh(scope, latitude, longitude, radius)
+        with self._lock:
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if not fresh:
+            return None
+        return self.query(latitude, longitude, radius, types=types, limit=limit)
+
+    def stats(self) -> dict:
+        with self._lock:
+            places = self._db.execute("SELECT COUNT(*) FROM places").fetchone()[0]
+            covered_circles = self._db.execute("SELECT COUNT(*) FROM coverage_circles").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "places": places,
+                "covered_circles": covered_circles,
+                "evicted": self.evicted,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_shared_index = None
+_shared_index_lock = threading.Lock()
+
+
+def get_place_index() -> PlaceIndex:
+    """
+    Returns the process-wide PlaceIndex, opening it on first use.
+    """
+    global _shared_index
+    with _shared_index_lock:
+        if _shared_index is None:
+            _shared_index = PlaceIndex()
+        return _shared_index
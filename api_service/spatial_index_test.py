@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+from spatial_index import PlaceIndex
+
+PARK = {
+    "place_id": "park",
+    "location": {"latitude": 37.78, "longitude": -122.41},
+    "types": ["park"],
+    "userRatingCount": 10,
+    "distance": 0.5,
+}
+MUSEUM = {
+    "place_id": "museum",
+    "location": {"latitude": 37.77, "longitude": -122.42},
+    "types": ["museum"],
+    "userRatingCount": 100,
+}
+
+
+class TestPlaceIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "index.sqlite3")
+        self.index = PlaceIndex(self.path)
+        self.index.add_places([PARK, MUSEUM])
+
+    def test_cold_area_falls_back(self):
+        self.assertIsNone(self.index.lookup("park", 37.7749, -122.4194, 5000, types=["park"]))
+
+    def test_fresh_area_is_served_locally(self):
+        self.index.mark_covered("park", 37.7749, -122.4194, 5000, result_count=1)
+        places = self.index.lookup("park", 37.7749, -122.4194, 5000, types=["park"])
+        self.assertEqual([place["place_id"] for place in places], ["park"])
+        self.assertNotIn("distance", places[0])
+
+    def test_index_is_persisted(self):
+        self.index.mark_covered("all", 37.7749, -122.4194, 5000, result_count=2)
+        reopened = PlaceIndex(self.path)
+        places = reopened.lookup("all", 37.7749, -122.4194, 5000)
+        self.assertEqual([place["place_id"] for place in places], ["museum", "park"])
+
+    def test_nearby_circle_that_was_never_searched_falls_back(self):
+        self.index.mark_covered("park", 37.7749, -122.4194, 500, result_count=1)
+        # About 1.75km east, in the same geohash cell but outside the searched circle
+        self.assertFalse(self.index.is_fresh("park", 37.7749, -122.3994, 500))
+        self.assertFalse(self.index.is_fresh("park", 37.7749, -122.4194, 1000))
+        self.assertTrue(self.index.is_fresh("park", 37.7750, -122.4194, 300))
+
+    def test_capped_search_is_not_marked_covered(self):
+        self.assertFalse(self.index.mark_covered("park", 37.7749, -122.4194, 5000, result_count=20, max_results=20))
+        self.assertIsNone(self.index.lookup("park", 37.7749, -122.4194, 5000, types=["park"]))
+
+    def test_oldest_places_are_evicted_with_their_coverage(self):
+        index = PlaceIndex(os.path.join(tempfile.mkdtemp(), "index.sqlite3"), max_places=1)
+        index.EVICT_EVERY = 1
+        index.add_places([PARK])
+        index.mark_covered("all", 37.7749, -122.4194, 5000, result_count=2)
+        index.add_places([MUSEUM])
+        self.assertEqual(index.stats()["places"], 1)
+        self.assertIsNone(index.lookup("all", 37.7749, -122.4194, 5000))
+        self.assertEqual([place["place_id"] for place in index.query(37.7749, -122.4194, 5000)], ["museum"])
+
+
+if __name__ == "__main__":
+    unittest.main()
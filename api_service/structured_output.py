@@ -0,0 +1,149 @@
+import re
+import json
+from jsonschema import Draft7Validator
+
+# Schemas are written in the JSON Schema subset Gemini accepts as a response_schema,
+# so the same dict constrains generation and validates the parsed result.
+
+
+def place_types_schema(place_types: list) -> dict:
+    return {"type": "array", "items": {"type": "string", "enum": list(place_types)}}
+
+
+def query_parse_schema(place_types: list) -> dict:
+    return {
+        "type": "object",
+        "properties": {
+            "use_text_search": {"type": "boolean"},
+            "text_query": {"type": "string"},
+            "types": place_types_schema(place_types),
+        },
+        "required": ["use_text_search"],
+    }
+
+
+_CODE_FENCE_PATTERN = re.compile(r"```(?:json|python)?\s*(.*?)\s*```", re.DOTALL)
+_TRAILING_COMMA_PATTERN = re.compile(r",\s*([}\]])")
+_PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+def _balance_brackets(text: str) -> str:
+    # Inserts the closers a sloppy or truncated response left out, e.g. '{"types": ["park"}'
+    output = []
+    expected = []
+    in_string = escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            expected.append("}" if char == "{" else "]")
+        elif char in "}]":
+            if char not in expected:
+                continue
+            while expected[-1] != char:
+                output.append(expected.pop())
+            expected.pop()
+        output.append(char)
+    if in_string:
+        output.append('"')
+    return "".join(output + expected[::-1])
+
+
+def repair_json(text: str):
+    """
+    Parses JSON from an LLM response, repairing the usual defects locally:
+    code fences, surrounding prose, single quotes, Python literals, trailing
+    commas and missing closing brackets.
+
+    Returns:
+        The parsed value
+
+    Raises:
+        ValueError: if no JSON value can be recovered
+    """
+    text = text.strip()
+    fenced = _CODE_FENCE_PATTERN.search(text)
+    if fenced:
+        text = fenced.group(1)
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+
+    starts = [index for index in (text.find("{"), text.find("[")) if index >= 0]
+    if not starts:
+        raise ValueError(f"No JSON value in response: {text[:200]}")
+    candidate = text[min(starts):]
+    candidate = re.sub(r"\b(True|False|None)\b", lambda match: _PYTHON_LITERALS[match.group(1)], candidate)
+    if '"' not in candidate:
+        candidate = candidate.replace("'", '"')
+
+    # Prefer dropping trailing prose after the last closer, then try the whole tail
+    end = max(candidate.rfind("}"), candidate.rfind("]"))
+    for attempt in ([candidate[:end + 1]] if end >= 0 else []) + [candidate]:
+        try:
+            return json.loads(_TRAILING_COMMA_PATTERN.sub(r"\1", _balance_brackets(attempt)))
+        except json.JSONDecodeError:
+            continue
+    raise ValueError(f"Unrepairable JSON in response: {text[:200]}")
+
+
+def normalize_place_types(values, place_types: list) -> list:
+    """
+    Keeps the valid place types from a list (or comma-separated string), in order and
+    without duplicates. "Italian Restaurant" is accepted for "italian_restaurant".
+    """
+    if isinstance(values, str):
+        values = values.split(",")
+    allowed = set(place_types)
+    normalized = []
+    for value in values if isinstance(values, list) else []:
+        place_type = re.sub(r"[\s-]+", "_", str(value).strip().strip("'\"").lower())
+        if place_type in allowed and place_type not in normalized:
+            normalized.append(place_type)
+    return normalized
+
+
+def parse_place_types(text: str, place_types: list) -> list:
+    """
+    Returns:
+        list: valid place types from a JSON array response, or from comma-separated text
+    """
+    try:
+        values = repair_json(text)
+    except ValueError:
+        values = text
+    return normalize_place_types(values, place_types)
+
+
+def parse_query_parse(text: str, query: str, place_types: list):
+    """
+    Parses the search-mode decision for a user query.
+
+    Returns:
+        dict or None: {"use_text_search": True, "text_query": ...} or {"use_text_search": False, "types": [...]},
+            None if the output cannot be repaired into a usable decision
+    """
+    try:
+        value = repair_json(text)
+    except ValueError:
+        return None
+    if not isinstance(value, dict):
+        return None
+    if not Draft7Validator(query_parse_schema(place_types)).is_valid(value):
+        # e.g. "use_text_search": "false", unknown types, a non-string query
+        value = {**value, "use_text_search": str(value.get("use_text_search")).lower() == "true"}
+
+    if not value["use_text_search"]:
+        types = normalize_place_types(value.get("types", []), place_types)
+        # A nearby search without valid types would search for everything
+        return {"use_text_search": False, "types": types} if types else None
+    text_query = value.get("text_query")
+    return {"use_text_search": True, "text_query": text_query if isinstance(text_query, str) and text_query.strip() else query}
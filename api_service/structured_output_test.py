@@ -0,0 +1,35 @@
+import unittest
+from structured_output import repair_json, parse_place_types, parse_query_parse
+
+PLACE_TYPES = ["book_store", "hiking_area", "library", "national_park", "park"]
+
+
+class TestStructuredOutput(unittest.TestCase):
+
+    def test_repairs_common_defects(self):
+        self.assertEqual(repair_json("```json\n{'a': True, 'b': [1, 2,],}\n```"), {"a": True, "b": [1, 2]})
+        self.assertEqual(repair_json('Here you go: {"types": ["park", "zoo"} Enjoy!'), {"types": ["park", "zoo"]})
+        with self.assertRaises(ValueError):
+            repair_json("no json here")
+
+    def test_place_types_from_json_or_comma_separated_text(self):
+        self.assertEqual(parse_place_types('["park", "mall", "park"]', PLACE_TYPES), ["park"])
+        self.assertEqual(parse_place_types("Hiking Area, library", PLACE_TYPES), ["hiking_area", "library"])
+
+    def test_query_parse(self):
+        self.assertEqual(
+            parse_query_parse('{"use_text_search": "false", "types": ["Book Store", "cinema"]}', "books", PLACE_TYPES),
+            {"use_text_search": False, "types": ["book_store"]},
+        )
+        self.assertEqual(
+            parse_query_parse('{"use_text_search": true, "text_query": "bubble tea"}', "bubble tea", PLACE_TYPES),
+            {"use_text_search": True, "text_query": "bubble tea"},
+        )
+
+    def test_query_parse_unusable_output_is_none(self):
+        self.assertIsNone(parse_query_parse("I think a text search", "bubble tea", PLACE_TYPES))
+        self.assertIsNone(parse_query_parse('{"use_text_search": false, "types": ["cinema"]}', "movies", PLACE_TYPES))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import re
+import math
+from collections import Counter
+
+CHUNK_WORDS = 120
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is",
+    "it", "its", "of", "on", "or", "that", "the", "this", "to", "was", "were", "with", "you", "your",
+}
+
+
+def tokenize(text: str) -> list:
+    return [token for token in _TOKEN_PATTERN.findall(text.lower()) if token not in _STOPWORDS]
+
+
+def chunk_text(text: str, chunk_words: int = CHUNK_WORDS) -> list:
+    """
+    Splits text into consecutive chunks of at most `chunk_words` words.
+    """
+    words = text.split()
+    return [" ".join(words[start:start + chunk_words]) for start in range(0, len(words), chunk_words)]
+
+
+class BM25:
+    """
+    Okapi BM25 over a small in-memory corpus of tokenized documents.
+    """
+
+    def __init__(self, documents: list, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_frequencies = [Counter(document) for document in documents]
+        self.lengths = [len(document) for document in documents]
+        self.average_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0
+        document_frequencies = Counter(term for frequencies in self.term_frequencies for term in frequencies)
+        total = len(documents)
+        self.idf = {
+            term: math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequencies.items()
+        }
+
+    def scores(self, query: list) -> list:
+        scores = []
+        for frequencies, length in zip(self.term_frequencies, self.lengths):
+            normalization = self.k1 * (1 - self.b + self.b * length / (self.average_length or 1))
+            scores.append(sum(
+                self.idf[term] * frequencies[term] * (self.k1 + 1) / (frequencies[term] + normalization)
+                for term in query
+                if term in frequencies
+            ))
+        return scores
+
+
+def select_relevant_chunks(documents: dict, query: str, max_words: int, chunk_words: int = CHUNK_WORDS) -> dict:
+    """
+    Picks the chunks most relevant to `query` across all documents within a word budget.
+
+    Chunks are ranked by BM25 score. Ties (including chunks that match nothing)
+    go round-robin over the documents, first chunks first, so with no matches
+    every document keeps its leading text.
+
+    Args:
+        documents (dict): source (e.g. URL) to document text
+        query (str): text describing what the chunks should be about
+        max_words (int): total words allowed across all selected chunks
+        chunk_words (int): words per chunk
+
+    Returns:
+        dict: source to its selected chunks, joined in their original order ("" if none selected)
+    """
+    chunks = [
+        (source, position, chunk)
+        for source, text in documents.items()
+        for position, chunk in enumerate(chunk_text(text, chunk_words))
+    ]
+    selected = {source: [] for source in documents}
+    if not chunks:
+        return {source: "" for source in documents}
+
+    scores = BM25([tokenize(chunk) for _, _, chunk in chunks]).scores(tokenize(query))
+    # Stable sort: equal scores rank by position within their document, then by document
+    ranking = sorted(range(len(chunks)), key=lambda index: (-scores[index], chunks[index][1]))
+    remaining = max_words
+    for index in ranking:
+        source, position, chunk = chunks[index]
+        length = len(chunk.split())
+        if length > remaining:
+            continue
+        selected[source].append((position, chunk))
+        remaining -= length
+    return {source: " ".join(chunk for _, chunk in sorted(picked)) for source, picked in selected.items()}
@@ -0,0 +1,33 @@
+import unittest
+from text_retrieval import chunk_text, select_relevant_chunks
+
+BOILERPLATE = "Subscribe to our newsletter for weekly deals and updates. " * 20
+HISTORY = "The lighthouse was built in 1874 and its lens still rotates every night. "
+
+
+class TestSelectRelevantChunks(unittest.TestCase):
+
+    def test_chunks_cover_all_words(self):
+        chunks = chunk_text("one two three four five", chunk_words=2)
+        self.assertEqual(chunks, ["one two", "three four", "five"])
+
+    def test_relevant_chunk_beats_leading_boilerplate(self):
+        documents = {"site": BOILERPLATE + HISTORY, "blog": BOILERPLATE}
+        selected = select_relevant_chunks(documents, "lighthouse history", max_words=20, chunk_words=15)
+        self.assertIn("lighthouse", selected["site"])
+        self.assertEqual(selected["blog"], "")
+
+    def test_budget_is_respected_and_order_kept_without_matches(self):
+        documents = {"site": "a1 a2 a3 a4 a5 a6 a7 a8"}
+        selected = select_relevant_chunks(documents, "museum", max_words=4, chunk_words=2)
+        self.assertEqual(selected["site"], "a1 a2 a3 a4")
+
+    def test_every_document_keeps_leading_text_without_matches(self):
+        documents = {"long": " ".join(f"a{i}" for i in range(1440)), "short": " ".join(f"b{i}" for i in range(20))}
+        selected = select_relevant_chunks(documents, "museum", max_words=40, chunk_words=10)
+        self.assertEqual(selected["long"], " ".join(f"a{i}" for i in range(20)))
+        self.assertEqual(selected["short"], " ".join(f"b{i}" for i in range(20)))
+
+
+if __name__ == "__main__":
+    unittest.main()
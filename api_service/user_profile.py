@@ -0,0 +1,128 @@
+import json
+import time
+import hashlib
+from cache import TTLCache
+from place_ranker import build_keywords
+from data_retriever import DataRetriever
+from google.cloud.firestore_v1._helpers import DatetimeWithNanoseconds
+
+
+def _is_restaurant(place: dict) -> bool:
+    types = place.get("types", [])
+    return "food" in types or "restaurant" in types
+
+
+def _custom_serializer(obj):
+    if isinstance(obj, DatetimeWithNanoseconds):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class UserProfileStore:
+    """
+    Precomputed per-user profile snapshots for the LLM prompts: a deterministic
+    sample of visited places, interests and descriptions, already serialized.
+
+    Snapshots are cached in memory and persisted in the `user_profiles`
+    collection. A snapshot is valid while its version matches the user's
+    `profileVersion`, which is bumped on every write that changes the profile
+    (see DataRetriever.bump_profile_version).
+    """
+
+    COLLECTION = "user_profiles"
+    CACHE_SIZE = 1000
+    CACHE_TTL = 60 * 60
+    # How long a cached snapshot is trusted before re-reading the user's version
+    VERSION_CHECK_INTERVAL = 5
+
+    def __init__(self, data_retriever: DataRetriever):
+        self.data_retriever = data_retriever
+        self._cache = TTLCache(maxsize=self.CACHE_SIZE, ttl=self.CACHE_TTL)
+        self._checked_at = {}
+
+    def invalidate(self, email: str):
+        self._cache.delete(email)
+        self._checked_at.pop(email, None)
+
+    def get_snapshot(self, email: str, limit: int) -> dict:
+        """
+        Returns the user's current profile snapshot, rebuilding it only when the
+        profile version changed.
+
+        Args:
+            email (str): user email
+            limit (int): maximum number of visited places in the snapshot
+
+        Returns:
+            dict: snapshot with "version", "visited_places" and "interests" (JSON strings),
+                "userDescription" and "geminiDescription"
+        """
+        cached = self._cache.get(email)
+        if (
+            cached
+            and cached["limit"] == limit
+            and time.monotonic() - self._checked_at.get(email, 0) < self.VERSION_CHECK_INTERVAL
+        ):
+            return cached
+
+        user_data = self.data_retriever.fetch_document_by_id("users", email) or {}
+        version = user_data.get("profileVersion", 0)
+        self._checked_at[email] = time.monotonic()
+        if cached and cached["version"] == version and cached["limit"] == limit:
+            return cached
+
+        snapshot = self.data_retriever.fetch_document_by_id(self.COLLECTION, email)
+        if not snapshot or snapshot.get("version") != version or snapshot.get("limit") != limit:
+            snapshot = self._build_snapshot(email, user_data, version, limit)
+            self.data_retriever.write_to_collection_with_id(self.COLLECTION, email, snapshot)
+        self._cache.set(email, snapshot)
+        return snapshot
+
+    def get_keywords(self, email: str, limit: int, query: str = "") -> dict:
+        """
+        Keyword profile of the user for the local place ranker (see place_ranker.build_keywords).
+        """
+        snapshot = self.get_snapshot(email, limit)
+        visited_places = json.loads(snapshot["visited_places"])["visited places"]
+        return build_keywords(
+            interests=json.loads(snapshot["interests"])["interests"],
+            visited_types=[place_type for place in visited_places for place_type in place.get("types", [])],
+            query=query,
+        )
+
+    def _sample(self, email: str, places: list, size: int) -> list:
+        # Deterministic per user: the same saved places always give the same sample
+        if len(places) <= size:
+            return places
+        return sorted(
+            places,
+            key=lambda place: hashlib.sha1(f"{email}:{place['title']}".encode("utf-8")).hexdigest(),
+        )[:size]
+
+    def _build_snapshot(self, email: str, user_data: dict, version: int, limit: int) -> dict:
+        # Visited places (get half restaurants half non restaurants since most visited places are restaurants)
+        visited_places = self.data_retriever.fetch_document_by_criteria("saved_places", "user_email", email)
+        projected = [
+            {
+                "title": place.get("title", ""),
+                "types": place.get("types", []),
+                "note": place.get("note", ""),
+                "place_description": place.get("place_description", ""),
+                "comment": place.get("comment", ""),
+            }
+            for place in visited_places
+        ]
+        other_places = self._sample(email, [place for place in projected if not _is_restaurant(place)], limit // 2)
+        restaurants = self._sample(email, [place for place in projected if _is_restaurant(place)], limit // 2)
+
+        return {
+            "email": email,
+            "version": version,
+            "limit": limit,
+            "visited_places": json.dumps(
+                {"visited places": other_places + restaurants}, default=_custom_serializer
+            ),
+            "interests": json.dumps({"interests": user_data.get("interests", [])}),
+            "userDescription": user_data.get("userDescription", ""),
+            "geminiDescription": user_data.get("geminiDescription", ""),
+        }